@@ -1,5 +1,20 @@
 class AST:
-    pass
+    # The offset of the node's first token inside the source, set by the parser for statements and calls
+    pos = None
+
+    # Fields that only cache things while the program runs
+    runtime_fields = ()
+
+    def __getstate__(self):
+        """
+        Nodes are pickled without their runtime caches,
+        which may hold compiled code and aren't valid in another process anyway
+        """
+
+        return {
+            name: value for name, value in self.__dict__.items()
+            if name not in self.runtime_fields
+        }
 
 class NOOP(AST):
     pass
@@ -39,12 +54,34 @@ class String(AST):
 
 
 class BinaryOperation(AST):
+    # The operand types seen by the latest executions, while specializing
+    observed = None
+    executions = 0
+    failures = 0
+
+    runtime_fields = ("observed", "executions", "failures")
+
     def __init__(self, left, token, right):
         self.token = token
         self.right = right
         self.left = left
 
 
+class SpecializedBinaryOperation(BinaryOperation):
+    """
+    A binary operation that has rewritten itself for the operand types it has seen
+    It's never created by the parser, BinaryOperation nodes turn into it while running
+    """
+
+    operation = None
+    left_type = None
+    right_type = None
+
+    def __reduce__(self):
+        # Sent as the generic operation, which may specialize again
+        return (BinaryOperation, (self.left, self.token, self.right))
+
+
 class UnaryOperation(AST):
     def __init__(self, token, expression):
         self.token = token
@@ -63,24 +100,99 @@ class VariableAssignment(AST):
         self.right = right
 
 
+class MapLiteral(AST):
+    """
+    {κλειδί: τιμή, ...}
+    The keys and the values are kept in separate lists of the same length
+    """
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+
+class Index(AST):
+    """
+    χάρτης[κλειδί], the target can be any expression
+    """
+
+    def __init__(self, target, key):
+        self.target = target
+        self.key = key
+
+
+class IndexAssignment(AST):
+    def __init__(self, target, key, right):
+        self.target = target
+        self.key = key
+        self.right = right
+
+
+class Temporary(AST):
+    """
+    A value saved by the optimizer, such as a hoisted loop invariant
+    Its name can't be written in Ermis, so it never clashes with the program's names
+
+    A deferred temporary keeps the error its expression raises instead of raising it,
+    so the error is only raised where a TemporaryRead reads it, where the expression used to be
+    """
+
+    def __init__(self, name, right, deferred = False):
+        self.name = name
+        self.right = right
+        self.deferred = deferred
+
+
+class TemporaryRead(AST):
+    def __init__(self, name):
+        self.name = name
+
+
 class Variable(AST):
     def __init__(self, token):
         self.name = token.value
 
 
 class FunctionCall(AST):
+    # The call site's cache: the resolved builtin or Function,
+    # with the Binding of the name and its version at the time
+    target = None
+    binding = None
+    version = None
+
+    runtime_fields = ("target", "binding", "version")
+
     def __init__(self, name, parameters):
         self.name = name
         self.parameters = parameters
 
 
 class Function(AST):
+    # The scope of the module that defined the function, if any
+    scope = None
+
+    # Tiered execution: the number of calls, the compiled body is kept by the visitor
+    calls = 0
+
+    runtime_fields = ("calls",)
+
     def __init__(self, name, parameters, block):
         self.name = name
         self.parameters = parameters
         self.block = block
 
 
+class LazyBlock(AST):
+    """
+    The unparsed body of a lazily parsed function
+    It only remembers where the body's left curly bracket is in the source
+    """
+
+    def __init__(self, source, start):
+        self.source = source
+        self.start = start
+
+
 class Return(AST):
     def __init__(self, right = NOOP()):
         self.right = right
@@ -94,7 +206,18 @@ class IfStatement(AST):
 
 
 class WhileStatement(AST):
+    # Tiered execution: the number of iterations, the compiled loop is kept by the visitor
+    iterations = 0
+
+    runtime_fields = ("iterations",)
+
     def __init__(self, condition, block):
         self.condition = condition
         self.block = block
 
+
+
+class Import(AST):
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
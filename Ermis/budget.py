@@ -0,0 +1,205 @@
+from threading import Thread, Semaphore
+from time import perf_counter, sleep
+
+from .exceptions import ExecutionLimitError
+
+class Budget:
+    """
+    Holds the execution limits of a single Ermis program
+    Every limit is optional, None meaning that there's no limit at all
+
+    steps:   the number of AST nodes the visitor may evaluate
+    seconds: the running time of the program, paused slices are not counted
+    depth:   the number of nested function calls
+    """
+
+    # Steps taken between two readings of the clock
+    clock_interval = 1000
+
+    def __init__(self, steps = None, seconds = None, depth = None):
+        self.max_steps = steps
+        self.max_seconds = seconds
+        self.max_depth = depth
+
+        self.steps = 0
+        self.depth = 0
+        self.elapsed = 0.0
+
+        self.started = perf_counter()
+        self.next_check = 0
+
+        # Used by TimeSlice to hand control back to the host
+        self.slice_end = None
+        self.on_slice_end = None
+
+    def start(self):
+        self.started = perf_counter()
+        self.schedule_check()
+
+    def stop(self):
+        self.elapsed += perf_counter() - self.started
+
+    def step(self):
+        """
+        Counts a single step
+        The expensive checks only run once every few steps
+        """
+
+        self.steps += 1
+
+        if self.steps >= self.next_check:
+            self.check()
+
+    def check(self):
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionLimitError("steps", self.max_steps)
+
+        if self.max_seconds is not None \
+                and self.elapsed + perf_counter() - self.started > self.max_seconds:
+            raise ExecutionLimitError("seconds", self.max_seconds)
+
+        if self.slice_end is not None and self.steps >= self.slice_end:
+            self.on_slice_end()
+
+        self.schedule_check()
+
+    def sleep(self, seconds):
+        """
+        Sleeps on behalf of the program
+        The clock is only read between steps, so a sleep that outlasts the time limit
+        is cut short and fails at the moment the limit runs out
+        """
+
+        if self.max_seconds is not None:
+            remaining = self.max_seconds - (self.elapsed + perf_counter() - self.started)
+
+            if seconds > remaining:
+                sleep(max(remaining, 0))
+
+                raise ExecutionLimitError("seconds", self.max_seconds)
+
+        sleep(seconds)
+
+    def schedule_check(self):
+        next_check = self.steps + self.clock_interval
+
+        if self.max_steps is not None:
+            next_check = min(next_check, self.max_steps + 1)
+
+        if self.slice_end is not None:
+            next_check = min(next_check, self.slice_end)
+
+        self.next_check = next_check
+
+    def enter_call(self):
+        self.depth += 1
+
+        if self.max_depth is not None and self.depth > self.max_depth:
+            raise ExecutionLimitError("depth", self.max_depth)
+
+    def exit_call(self):
+        self.depth -= 1
+
+
+class TimeSlice:
+    """
+    Runs an Ermis program in resumable slices
+
+    The program lives on its own thread, but only one of the host and the program
+    is running at any moment: resume() hands control to the program for a number of steps
+    and blocks until the slice is used up or the program has finished
+    """
+
+    def __init__(self, visitor):
+        if visitor.budget is None:
+            visitor.enforce_budget(Budget())
+
+        self.visitor = visitor
+        self.budget = visitor.budget
+        self.budget.on_slice_end = self.pause
+
+        self.thread = None
+        self.finished = False
+        self.result = None
+        self.error = None
+
+        self.running = Semaphore(0)
+        self.paused = Semaphore(0)
+
+    def resume(self, steps):
+        """
+        Runs the program for (at most) the given number of steps
+        Returns whether the program has finished
+        """
+
+        if self.finished:
+            return True
+
+        self.budget.slice_end = self.budget.steps + steps
+
+        if self.thread is None:
+            self.thread = Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+        else:
+            self.running.release()
+
+        self.paused.acquire()
+
+        return self.finished
+
+    def run(self):
+        try:
+            self.result = self.visitor.execute()
+
+        except Exception as error:
+            self.error = error
+
+        self.finished = True
+        self.paused.release()
+
+    def pause(self):
+        """
+        Called from the program's thread when its slice is used up
+        It blocks the program until the host resumes it
+        """
+
+        self.budget.stop()
+
+        self.paused.release()
+        self.running.acquire()
+
+        self.budget.start()
+
+
+class Scheduler:
+    """
+    Round-robins many Ermis programs on the calling thread
+    Each program runs for quantum steps before the next one takes its turn
+    """
+
+    def __init__(self, quantum = 1000):
+        self.quantum = quantum
+        self.slices = []
+
+    def add(self, visitor):
+        time_slice = TimeSlice(visitor)
+        self.slices.append(time_slice)
+
+        return time_slice
+
+    def run(self):
+        """
+        Runs every program to completion
+        Errors are kept in each slice's error attribute instead of being raised
+        """
+
+        pending = list(self.slices)
+
+        while pending:
+            pending = [
+                time_slice for time_slice in pending
+                if not time_slice.resume(self.quantum)
+            ]
+
+        return self.slices
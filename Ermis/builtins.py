@@ -1,5 +1,12 @@
 from time import sleep
 import random
+import sys
+
+from .exceptions import WrongArgumentError, MissingKeyError, UnhashableKeyError
+from .mapping import ErmisMap, show
+from .rope import Rope
+from .memory import map_size
+from .operations import number_types
 
 ermis_globals = {}
 
@@ -11,19 +18,40 @@ def builtin(function):
     
     ermis_globals[function.__name__] = function
 
-@builtin
-def εμφάνισε(*parameters):
+# The builtins which are given the interpreter that calls them as their first parameter
+interpreter_builtins = set()
+
+def interpreter_builtin(function):
+    builtin(function)
+    interpreter_builtins.add(function.__name__)
+
+@interpreter_builtin
+def εμφάνισε(interpreter, *parameters):
+    """
+    Prints to the interpreter's output, so programs sharing a process don't mix their output
+    """
+
+    output = interpreter.output or sys.stdout
+
     for param in parameters:
         if isinstance(param, bool):
-            print(["Ψευδές", "Αληθές"][param], end=" ")
+            print(["Ψευδές", "Αληθές"][param], end=" ", file=output)
         else:
-            print(param, end=" ")
+            print(param, end=" ", file=output)
 
-    print()
+    print(file=output)
 
-@builtin
-def περίμενε(delay):
-    sleep(delay)
+@interpreter_builtin
+def περίμενε(interpreter, delay):
+    """
+    Sleeps for a number of seconds, but never past the interpreter's time limit
+    """
+
+    if interpreter.budget is not None:
+        interpreter.budget.sleep(delay)
+
+    else:
+        sleep(delay)
 
 @builtin
 def ρίζα(number):
@@ -31,10 +59,16 @@ def ρίζα(number):
 
 @builtin
 def mod(a, b):
+    if type(a) not in number_types or type(b) not in number_types:
+        raise WrongArgumentError("mod")
+
     return a % b
 
 @builtin
 def div(a, b):
+    if type(a) not in number_types or type(b) not in number_types:
+        raise WrongArgumentError("div")
+
     return a // b
 
 @builtin
@@ -45,8 +79,95 @@ def ακέραιος(x):
 def τυχαίος_ακέραιος(start, end):
     return random.randint(start, end)
 
+@interpreter_builtin
+def διάβασε(interpreter, message):
+    if interpreter.input is None:
+        return input(message)
+
+    print(message, end="", file=interpreter.output or sys.stdout)
+
+    return interpreter.input.readline().rstrip("\n")
+
+@builtin
+def περιέχει(mapping, key):
+    if not isinstance(mapping, ErmisMap):
+        raise WrongArgumentError("περιέχει")
+
+    try:
+        return key in mapping
+
+    except TypeError:
+        raise UnhashableKeyError() from None
+
+@interpreter_builtin
+def κλειδιά(interpreter, mapping):
+    """
+    Ermis has no lists, so the keys are returned as a map from their positions to them
+    """
+
+    if not isinstance(mapping, ErmisMap):
+        raise WrongArgumentError("κλειδιά")
+
+    if interpreter.meter is not None:
+        interpreter.meter.allocate(map_size(len(mapping)))
+
+    return ErmisMap(enumerate(mapping))
+
+@interpreter_builtin
+def αφαίρεσε(interpreter, mapping, key):
+    """
+    Removes a key and returns its value
+    """
+
+    if not isinstance(mapping, ErmisMap):
+        raise WrongArgumentError("αφαίρεσε")
+
+    try:
+        value = mapping.pop(key)
+
+    except KeyError:
+        raise MissingKeyError(show(key)) from None
+
+    except TypeError:
+        raise UnhashableKeyError() from None
+
+    if interpreter.meter is not None:
+        interpreter.meter.forget(mapping, key, value)
+
+    return value
+
 @builtin
-def διάβασε(message):
-    return input(message)
+def μήκος(value):
+    """
+    The number of keys of a map, or the number of characters of a string
+    """
+
+    if not isinstance(value, (ErmisMap, str, Rope)):
+        raise WrongArgumentError("μήκος")
+
+    return len(value)
+
+@interpreter_builtin
+def εύρος(interpreter, start, end):
+    """
+    The whole numbers from start up to end, as a map from their positions to them
+    """
+
+    numbers = range(start, end)
+
+    if interpreter.meter is not None:
+        interpreter.meter.allocate(map_size(len(numbers)))
+
+    return ErmisMap(enumerate(numbers))
+
+@interpreter_builtin
+def παράλληλα(interpreter, function, arguments):
+    """
+    Calls a function once for every value of a map, across a pool of processes
+    Returns a map with the same keys, holding the results
+    """
 
+    # Imported here, the parallel module needs the builtins itself
+    from .parallel import parallel_map
 
+    return parallel_map(interpreter, function, arguments)
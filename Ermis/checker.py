@@ -0,0 +1,394 @@
+"""
+Checks .ermis files without executing them
+
+Every file is parsed with error recovery, so all of its syntax errors are found,
+and then checked for undefined names, wrong numbers of arguments and duplicate definitions
+
+Usage: python -m Ermis.checker [--jobs N] <files or directories>...
+The report is printed as JSON and the exit code is 1 when any error was found
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_right
+import argparse
+import inspect
+import json
+import sys
+import os
+
+from .builtins import ermis_globals, interpreter_builtins
+from .token import TokenTypes
+from .parser import Parser
+from .lexer import Lexer
+from .modules import module_name
+from .optimizer import walk
+from .exceptions import *
+from .AST import *
+
+class RecoveringParser(Parser):
+    """
+    A parser which doesn't stop at the first syntax error
+
+    A statement with an error is skipped up to the next semicolon,
+    or up to the right bracket that closes its block, and parsing continues from there
+    """
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.lazy = False
+
+        self.errors = []
+        self.seen = set()
+
+        self.current_token = None
+        self.next_token()
+        self.previous_token = self.current_token
+
+    def record(self, error):
+        # Recovering can run into the same error more than once
+        if (error.pos, error.message) not in self.seen:
+            self.seen.add((error.pos, error.message))
+            self.errors.append(error)
+
+    def next_token(self):
+        """
+        Moves to the next token, skipping the characters the lexer doesn't recognize
+        """
+
+        self.previous_token = self.current_token
+
+        while True:
+            try:
+                self.current_token = self.lexer.get_next_token()
+                return
+
+            except UnexpectedTokenError as error:
+                self.record(error)
+                self.lexer.advance()
+
+    def synchronize(self):
+        """
+        Skips tokens until the end of the broken statement
+        """
+
+        while self.current_token.type not in (TokenTypes.Semicolon, TokenTypes.RightCurly, TokenTypes.EOF):
+            self.next_token()
+
+        if self.current_token.type == TokenTypes.Semicolon:
+            self.next_token()
+
+    def parse_statements(self, end):
+        """
+        Parses statements until a token of the end type, recovering from every error
+        """
+
+        statements = []
+
+        while self.current_token.type not in (end, TokenTypes.EOF):
+            statement = self.parse_separated_statement(end)
+
+            if statement is not None:
+                statements.append(statement)
+
+        return statements
+
+    def parse_separated_statement(self, end):
+        """
+        Parses a statement along with the semicolon after it
+        Returns None when the statement had an error, which is recorded and skipped.
+        A statement missing only its semicolon is still returned, so it's checked as well
+        """
+
+        start = self.current_token
+        statement = None
+
+        try:
+            statement = self.parse_statement()
+
+            # Statements are separated by semicolons, which are optional after a right bracket
+            # When nothing could be parsed, the token is wrong in any case
+            if self.current_token.type not in (end, TokenTypes.EOF) \
+                    and (self.previous_token.type != TokenTypes.RightCurly or self.current_token is start):
+                self.eat(TokenTypes.Semicolon)
+
+            elif self.current_token.type == TokenTypes.Semicolon:
+                self.eat(TokenTypes.Semicolon)
+
+            return statement
+
+        except UnexpectedTokenError as error:
+            self.record(error)
+            self.lexer.advance()
+            self.next_token()
+            self.synchronize()
+
+        except ErmisError as error:
+            self.record(error)
+
+            # Only the semicolon is missing, the next statement starts right here
+            if statement is not None and self.current_token is not start:
+                return statement
+
+            self.synchronize()
+
+            # A right bracket that doesn't close this block is skipped
+            if end != TokenTypes.RightCurly and self.current_token.type == TokenTypes.RightCurly:
+                self.next_token()
+
+        return statement
+
+    def parse_compound(self):
+        return Compound(self.parse_statements(TokenTypes.EOF) or [NOOP()])
+
+    def parse_block(self):
+        self.eat(TokenTypes.LeftCurly)
+
+        block = self.parse_statements(TokenTypes.RightCurly)
+
+        self.eat(TokenTypes.RightCurly)
+
+        return Compound(block or [NOOP()])
+
+
+class StaticChecker:
+    """
+    Finds the errors of a parsed program that would only show up while running it
+
+    Ermis scopes are dynamic, a function sees the names of whoever calls it.
+    So the top level is checked in order, while a name inside of a function
+    is only undefined when it isn't defined anywhere in the program
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.errors = []
+
+        # Every name the program defines, anywhere
+        self.everywhere = set(ermis_globals)
+
+        # The number of parameters of every function, or None when a name has different ones
+        self.arities = {}
+
+        for node in walk(tree):
+            match node:
+                case VariableDefinition() | VariableAssignment():
+                    self.everywhere.add(node.name)
+                    self.arities[node.name] = None
+
+                case Function():
+                    self.everywhere.add(node.name)
+
+                    for param in node.parameters:
+                        self.everywhere.add(param.name)
+                        self.arities[param.name] = None
+
+                    arity = len(node.parameters)
+                    self.arities[node.name] = arity if self.arities.get(node.name, arity) == arity else None
+
+                case Import():
+                    self.everywhere.add(node.name or module_name(node.path))
+
+    def error(self, error, node):
+        error.pos = node.pos
+        self.errors.append(error)
+
+    def check(self):
+        self.check_block(self.tree.children, set(ermis_globals), in_function=False)
+
+        return self.errors
+
+    def check_block(self, statements, defined, in_function):
+        """
+        Checks statements which share a scope, adding the names they define to it
+        Blocks of if and while statements don't have scopes of their own
+        """
+
+        for statement in statements:
+            match statement:
+                case VariableDefinition():
+                    self.check_expression(statement.right, defined, in_function)
+
+                    if statement.name in defined and statement.name not in ermis_globals:
+                        self.error(AlreadyDefinedError(statement.name), statement)
+
+                    defined.add(statement.name)
+
+                case VariableAssignment():
+                    self.check_name(statement.name, statement, defined, in_function)
+                    self.check_expression(statement.right, defined, in_function)
+
+                case Function():
+                    defined.add(statement.name)
+
+                    if not isinstance(statement.block, LazyBlock):
+                        parameters = set()
+
+                        for param in statement.parameters:
+                            if param.name in parameters:
+                                self.error(AlreadyDefinedError(param.name), param)
+
+                            parameters.add(param.name)
+
+                        # The body sees the names defined so far and, dynamically, any other name
+                        self.check_block(statement.block.children, defined | parameters, in_function=True)
+
+                case Import():
+                    defined.add(statement.name or module_name(statement.path))
+
+                case IfStatement():
+                    self.check_expression(statement.condition, defined, in_function)
+                    self.check_block(statement.block.children, defined, in_function)
+
+                    if isinstance(statement.else_block, IfStatement):
+                        self.check_block([statement.else_block], defined, in_function)
+
+                    elif statement.else_block is not None:
+                        self.check_block(statement.else_block.children, defined, in_function)
+
+                case WhileStatement():
+                    self.check_expression(statement.condition, defined, in_function)
+                    self.check_block(statement.block.children, defined, in_function)
+
+                case Return():
+                    self.check_expression(statement.right, defined, in_function)
+
+                case NOOP():
+                    pass
+
+                case _:
+                    self.check_expression(statement, defined, in_function)
+
+    def check_expression(self, node, defined, in_function):
+        for child in walk(node):
+            match child:
+                case Variable():
+                    self.check_name(child.name, child, defined, in_function)
+
+                case FunctionCall():
+                    self.check_name(child.name, child, defined, in_function)
+                    self.check_arity(child)
+
+    def check_name(self, name, node, defined, in_function):
+        # Only the module of a qualified name can be checked
+        name = name.partition(".")[0]
+
+        if name in defined or (in_function and name in self.everywhere):
+            return
+
+        self.error(UndefinedVariableError(name), node)
+
+    def check_arity(self, node):
+        if "." in node.name:
+            return
+
+        builtin = ermis_globals.get(node.name)
+
+        if builtin is not None:
+            # Some builtins are also given the interpreter
+            parameters = [None] * (node.name in interpreter_builtins) + node.parameters
+
+            try:
+                inspect.signature(builtin).bind(*parameters)
+
+            except TypeError:
+                self.error(MissingFunctionParameter(node.name), node)
+
+        elif self.arities.get(node.name) not in (None, len(node.parameters)):
+            self.error(MissingFunctionParameter(node.name), node)
+
+
+def check_source(source):
+    """
+    Returns the syntax and static errors of a program, ordered by their position
+    """
+
+    parser = RecoveringParser(Lexer(source))
+    tree = parser.parse_compound()
+
+    errors = parser.errors + StaticChecker(tree).check()
+
+    return sorted(errors, key=lambda error: error.pos if error.pos is not None else -1)
+
+def check_file(path):
+    """
+    Checks a file and returns its report, with the line and the column of every error
+    """
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+
+    except (OSError, UnicodeDecodeError) as error:
+        return {"path": path, "errors": [{"line": None, "column": None, "type": type(error).__name__, "message": str(error)}]}
+
+    line_starts = [0] + [index + 1 for index, character in enumerate(source) if character == "\n"]
+    errors = []
+
+    for error in check_source(source):
+        line = column = None
+
+        if error.pos is not None:
+            line = bisect_right(line_starts, error.pos)
+            column = error.pos - line_starts[line - 1] + 1
+
+        errors.append({
+            "line": line,
+            "column": column,
+            "type": type(error).__name__,
+            "message": error.message
+        })
+
+    return {"path": path, "errors": errors}
+
+def collect_files(paths):
+    """
+    Expands directories into the .ermis files inside of them
+    """
+
+    files = []
+
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+
+        for directory, _, filenames in os.walk(path):
+            files += sorted(
+                os.path.join(directory, filename)
+                for filename in filenames if filename.endswith(".ermis")
+            )
+
+    return files
+
+def check_files(paths, jobs = None):
+    """
+    Checks many files in parallel, the reports keep the order of the files
+    """
+
+    files = collect_files(paths)
+
+    if len(files) < 2 or jobs == 1:
+        return [check_file(path) for path in files]
+
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(check_file, files, chunksize=max(1, len(files) // 64)))
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(prog="python -m Ermis.checker", description="Checks .ermis files without running them")
+    parser.add_argument("paths", nargs="+", help="files or directories to check")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+
+    options = parser.parse_args(arguments)
+    reports = check_files(options.paths, options.jobs)
+
+    error_count = sum(len(report["errors"]) for report in reports)
+
+    json.dump({"files": reports, "errors": error_count}, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
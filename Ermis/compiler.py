@@ -0,0 +1,273 @@
+from .exceptions import (
+    UndefinedVariableError,
+    WrongTypeError,
+    FoundReturn,
+    Failure
+)
+
+from .operations import promote, text, binary_operations
+from .mapping import index, new_map
+from .token import TokenTypes
+from .AST import *
+
+# The Python spelling of every binary operator
+python_operators = {
+    TokenTypes.Plus:         "+",
+    TokenTypes.Minus:        "-",
+    TokenTypes.Multiply:     "*",
+    TokenTypes.Divide:       "/",
+    TokenTypes.Modulo:       "%",
+    TokenTypes.IntegerDivide: "//",
+    TokenTypes.Power:        "**",
+    TokenTypes.GreaterThan:  ">",
+    TokenTypes.GreaterEqual: ">=",
+    TokenTypes.LessThan:     "<",
+    TokenTypes.LessEqual:    "<=",
+    TokenTypes.NotEquals:    "!=",
+    TokenTypes.EqualsEquals: "==",
+    TokenTypes.And:          "and",
+    TokenTypes.Or:           "or"
+}
+
+# The operators that check their operands are numbers, and the names of their operations,
+# which the generated code only calls for operands that aren't both integers
+checked_operators = {
+    TokenTypes.Modulo:        "_modulo",
+    TokenTypes.IntegerDivide: "_floor_divide",
+    TokenTypes.Power:         "_power"
+}
+
+def undefined(name):
+    raise UndefinedVariableError(name)
+
+def failed(failure):
+    raise failure.error
+
+
+class Compiler:
+    """
+    Compiles hot functions and loops into Python functions
+
+    The generated code works on the same LocalScope objects as the visitor,
+    so compiled and visited code can call each other freely.
+    Ermis names are only ever used as dictionary keys, never as Python names.
+    Nodes that have no Python translation are handed back to the visitor.
+    """
+
+    def __init__(self, visitor):
+        self.visitor = visitor
+
+    def compile_function(self, function):
+        """
+        Returns a Python function which runs the body of an Ermis function inside of a scope
+        """
+
+        return self.build(function.block, function.name, in_function=True)
+
+    def compile_loop(self, node):
+        """
+        Returns a Python function which runs a while statement inside of a scope
+        Return statements raise FoundReturn, just like the visitor does
+        """
+
+        return self.build(node, "όσο", in_function=False)
+
+    def build(self, node, name, in_function):
+        self.constants = []
+        self.in_function = in_function
+
+        # Numbers the names of the operands that checked operators save
+        self.operands = 0
+
+        lines = [
+            "def compiled(scope):",
+            "    data = scope.data",
+            "    _get = data.get",
+            "    _insert = scope.insert",
+            "    _create = scope.create",
+            "    _find = scope.find"
+        ]
+
+        lines += self.statement(node, 1)
+
+        namespace = {
+            "_k": self.constants,
+            "_call": self.visitor.call,
+            "_visit": self.visitor.visit,
+            "_undefined": undefined,
+            "_failed": failed,
+            "_Failure": Failure,
+            "_promote": promote,
+            "_text": text,
+            "_index": index,
+            "_store": self.visitor.store,
+            "_multiply": self.visitor.operations[TokenTypes.Multiply],
+            **{name: binary_operations[token_type] for token_type, name in checked_operators.items()},
+            "_new_map": new_map,
+            "WrongTypeError": WrongTypeError,
+            "FoundReturn": FoundReturn
+        }
+
+        code = compile("\n".join(lines), f"<ermis {name}>", "exec")
+        exec(code, namespace)
+
+        return namespace["compiled"]
+
+    def constant(self, value):
+        """
+        Returns the Python code that reaches a node from the generated code
+        """
+
+        self.constants.append(value)
+
+        return f"_k[{len(self.constants) - 1}]"
+
+    def statement(self, node, depth):
+        indent = "    " * depth
+
+        match node:
+            case Compound():
+                lines = []
+
+                for child in node.children:
+                    lines += self.statement(child, depth)
+
+                return lines or [indent + "pass"]
+
+            case NOOP():
+                return []
+
+            case VariableDefinition():
+                return [f"{indent}_create({node.name!r}, {self.expression(node.right)})"]
+
+            case VariableAssignment() if "." not in node.name:
+                return [
+                    f"{indent}_o = _get({node.name!r})",
+                    f"{indent}if _o is None: _undefined({node.name!r})",
+                    f"{indent}_t = {self.expression(node.right)}",
+                    f"{indent}if type(_o) is not type(_t) and not (isinstance(_o, _text) and isinstance(_t, _text)):",
+                    f"{indent}    raise WrongTypeError({node.name!r})",
+                    f"{indent}_insert({node.name!r}, _t)"
+                ]
+
+            case Temporary() if node.deferred:
+                return [
+                    f"{indent}try:",
+                    f"{indent}    _t = {self.expression(node.right)}",
+                    f"{indent}except Exception as _e:",
+                    f"{indent}    _t = _Failure(_e)",
+                    f"{indent}_insert({node.name!r}, _t)"
+                ]
+
+            case Temporary():
+                return [f"{indent}_insert({node.name!r}, {self.expression(node.right)})"]
+
+            case IndexAssignment():
+                target, key = self.expression(node.target), self.expression(node.key)
+
+                return [f"{indent}_store({target}, {key}, {self.expression(node.right)})"]
+
+            case Function():
+                return [f"{indent}_insert({node.name!r}, {self.constant(node)})"]
+
+            case Return():
+                if self.in_function:
+                    return [f"{indent}return {self.expression(node.right)}"]
+
+                return [f"{indent}raise FoundReturn({self.expression(node.right)})"]
+
+            case IfStatement():
+                lines = [f"{indent}if {self.expression(node.condition)}:"]
+                lines += self.statement(node.block, depth + 1)
+
+                if node.else_block is not None:
+                    lines.append(f"{indent}else:")
+                    lines += self.statement(node.else_block, depth + 1)
+
+                return lines
+
+            case WhileStatement():
+                lines = [f"{indent}while {self.expression(node.condition)}:"]
+                lines += self.statement(node.block, depth + 1)
+
+                return lines
+
+            case FunctionCall() | Variable() | BinaryOperation() | UnaryOperation() | Index() | MapLiteral():
+                return [indent + self.expression(node)]
+
+        return [f"{indent}_visit({self.constant(node)})"]
+
+    def expression(self, node):
+        match node:
+            case Number() | Float() | String():
+                return repr(node.value)
+
+            case Boolean():
+                return repr(node.value == "Αληθές")
+
+            case NOOP():
+                return "None"
+
+            case Variable() if "." in node.name:
+                return f"_find({node.name!r})"
+
+            case Variable():
+                return f"(_v if (_v := _get({node.name!r})) is not None else _undefined({node.name!r}))"
+
+            case TemporaryRead():
+                return f"(_v if type(_v := _get({node.name!r})) is not _Failure else _failed(_v))"
+
+            # Long strings become Ropes before they are added to, like in operations.add
+            case BinaryOperation() if node.token.type == TokenTypes.Plus:
+                left, right = self.expression(node.left), self.expression(node.right)
+
+                return f"((_promote(_l) if type(_l := {left}) is str else _l) + {right})"
+
+            # Counted programs check the strings they repeat against their quota
+            case BinaryOperation() if node.token.type == TokenTypes.Multiply and self.visitor.meter is not None:
+                return f"_multiply({self.expression(node.left)}, {self.expression(node.right)})"
+
+            # Operators that only work with numbers run in place on two integers
+            # and call their checked operation otherwise. The operands get names of their own,
+            # since the right side may hold another checked operator, and & evaluates both sides
+            case BinaryOperation() if node.token.type in checked_operators:
+                name = checked_operators[node.token.type]
+                operator = python_operators[node.token.type]
+
+                left, right = f"_l{self.operands}", f"_r{self.operands}"
+                self.operands += 1
+
+                check = (
+                    f"(type({left} := {self.expression(node.left)}) is int)"
+                    f" & (type({right} := {self.expression(node.right)}) is int)"
+                )
+
+                return f"({left} {operator} {right} if {check} else {name}({left}, {right}))"
+
+            case BinaryOperation():
+                operator = python_operators[node.token.type]
+
+                return f"({self.expression(node.left)} {operator} {self.expression(node.right)})"
+
+            case UnaryOperation():
+                sign = "+" if node.token.type == TokenTypes.Plus else "-"
+
+                return f"({sign}{self.expression(node.expression)})"
+
+            case FunctionCall():
+                parameters = ", ".join(self.expression(param) for param in node.parameters)
+
+                return f"_call({self.constant(node)}, [{parameters}])"
+
+            case Index():
+                return f"_index({self.expression(node.target)}, {self.expression(node.key)})"
+
+            case MapLiteral():
+                entries = "".join(
+                    f"({self.expression(key)}, {self.expression(value)}), "
+                    for key, value in zip(node.keys, node.values)
+                )
+
+                return f"_new_map(({entries}))"
+
+        return f"_visit({self.constant(node)})"
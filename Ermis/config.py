@@ -8,12 +8,18 @@ tokens = {
     "-": TokenTypes.Minus,
     "*": TokenTypes.Multiply,
     "/": TokenTypes.Divide,
+    "%": TokenTypes.Modulo,
+    "^": TokenTypes.Power,
     ";": TokenTypes.Semicolon,
     ",": TokenTypes.Comma,
     ">": TokenTypes.GreaterThan,
     "<": TokenTypes.LessThan,
     "{": TokenTypes.LeftCurly,
-    "}": TokenTypes.RightCurly
+    "}": TokenTypes.RightCurly,
+    "[": TokenTypes.LeftBracket,
+    "]": TokenTypes.RightBracket,
+    ":": TokenTypes.Colon,
+    ".": TokenTypes.Dot
 }
 
 keywords = {
@@ -26,6 +32,29 @@ keywords = {
     "αλλιώς": TokenTypes.Else,
     "όσο": TokenTypes.While,
     "και": TokenTypes.And,
-    "ή": TokenTypes.Or
+    "ή": TokenTypes.Or,
+    "εισάγαγε": TokenTypes.Import,
+    "ως": TokenTypes.As
 }
 
+
+# Binary operators with their precedence and associativity
+# A higher precedence binds tighter, so "α + 1 > β και γ" means "((α + 1) > β) και γ"
+# Powers are the only right associative operators, "2 ^ 3 ^ 2" means "2 ^ (3 ^ 2)"
+operators = {
+    TokenTypes.Or:           (1, "left"),
+    TokenTypes.And:          (2, "left"),
+    TokenTypes.EqualsEquals: (3, "left"),
+    TokenTypes.NotEquals:    (3, "left"),
+    TokenTypes.GreaterThan:  (4, "left"),
+    TokenTypes.GreaterEqual: (4, "left"),
+    TokenTypes.LessThan:     (4, "left"),
+    TokenTypes.LessEqual:    (4, "left"),
+    TokenTypes.Plus:         (5, "left"),
+    TokenTypes.Minus:        (5, "left"),
+    TokenTypes.Multiply:     (6, "left"),
+    TokenTypes.Divide:       (6, "left"),
+    TokenTypes.Modulo:       (6, "left"),
+    TokenTypes.IntegerDivide: (6, "left"),
+    TokenTypes.Power:        (7, "right")
+}
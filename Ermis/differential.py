@@ -0,0 +1,409 @@
+"""
+Differential testing of the Ermis engines
+
+Every program runs on every engine (the plain visitor, lazy parsing, the optimizer passes,
+specialization, tiered compilation, budgets, memory meters, metrics and streamed lexing) and the outcomes are compared:
+the printed output, the final values of the global names and the error that was raised, if any
+
+Long strings become Ropes once they are added to, so every string operation is also checked
+on a long string, both as a plain string and as a Rope. The operand rules the TypeChecker uses
+are checked against the operations themselves, and two interpreters sharing a module
+are checked to keep their output apart
+
+Usage: python -m Ermis.differential [--programs N] [--seed S] [--save DIRECTORY]
+The exit code is 1 when any engine disagrees with the plain visitor, a Rope with its string,
+the operand rules with the operations or an interpreter prints through another one
+"""
+
+from contextlib import redirect_stdout
+import argparse
+import tempfile
+import io
+import os
+import sys
+
+from .lexer import Lexer
+from .parser import Parser
+from .visitor import ErmisVisitor
+from .budget import Budget
+from .memory import Meter
+from .metrics import Metrics
+from .optimizer import Inliner, LoopInvariantMotion, CommonSubexpressions
+from .passes import ConstantFolding
+from .generator import generate
+from .modules import ModuleLoader
+from .operations import binary_operations, result_type, rope_after
+from .builtins import ermis_globals
+from .mapping import ErmisMap, show
+from .rope import Rope
+from .exceptions import ErmisError
+from .AST import Function
+
+engines = {}
+
+def engine(function):
+    """
+    A decorator to save functions which build a visitor for a program
+    into the engines dictionary
+    """
+
+    engines[function.__name__] = function
+
+    return function
+
+def all_passes():
+    return [ConstantFolding(), Inliner(), LoopInvariantMotion(), CommonSubexpressions()]
+
+
+@engine
+def visitor(source, path):
+    return ErmisVisitor(Parser(Lexer(source)))
+
+@engine
+def lazy(source, path):
+    return ErmisVisitor(Parser(Lexer(source), lazy=True))
+
+@engine
+def optimized(source, path):
+    return ErmisVisitor(Parser(Lexer(source)), passes=all_passes())
+
+@engine
+def specialized(source, path):
+    return ErmisVisitor(Parser(Lexer(source)), specialize=True)
+
+@engine
+def tiered(source, path):
+    return ErmisVisitor(Parser(Lexer(source)), tier_up_after=2)
+
+@engine
+def budgeted(source, path):
+    return ErmisVisitor(Parser(Lexer(source)), budget=Budget())
+
+@engine
+def metered(source, path):
+    # Tiered as well, so the compiled code's key assignments are counted too
+    return ErmisVisitor(Parser(Lexer(source)), tier_up_after=2, meter=Meter())
+
+@engine
+def measured(source, path):
+    return ErmisVisitor(Parser(Lexer(source)), specialize=True, metrics=Metrics())
+
+@engine
+def streamed(source, path):
+    # A tiny window makes tokens cross the chunk boundaries
+    return ErmisVisitor(Parser(Lexer.from_file(path, chunk_size=7)))
+
+@engine
+def everything(source, path):
+    return ErmisVisitor(
+        Parser(Lexer.from_file(path, chunk_size=7), lazy=True),
+        budget=Budget(),
+        passes=all_passes(),
+        specialize=True,
+        tier_up_after=2,
+        meter=Meter(),
+        metrics=Metrics()
+    )
+
+
+# Programs that engines have disagreed on before, compared ahead of the random ones
+regressions = [
+    # Hoisting the division out of the loop made it fail before printing
+    'έστω ν = 0; έστω ι = 0; όσο (ι < 1) { εμφάνισε ("πριν"); έστω ψ = 10 / ν; ι = ι + 1; }',
+
+    # Sharing 1 / ν computed it before φ printed
+    'συνάρτηση φ () { εμφάνισε ("φ"); επέστρεψε 1; } έστω ν = 0; εμφάνισε (φ (), 1 / ν + 1 / ν);',
+
+    # Inlining φ moved 1 / ν after the call of γ
+    'συνάρτηση γ () { εμφάνισε ("γ"); επέστρεψε 1; } συνάρτηση φ (χ) { επέστρεψε γ () + χ; } έστω ν = 0; εμφάνισε (φ (1 / ν));',
+
+    # Inlining φ moved 1 / ν to the right of και, which never evaluated it
+    'συνάρτηση φ (χ) { επέστρεψε Ψευδές και χ; } έστω ν = 0; έστω α = φ (1 / ν); εμφάνισε (α);',
+
+    # The hoisted α + β raised its TypeError before χ failed to change its type
+    'έστω χ = 1; έστω α = "α"; έστω β = 2; έστω ι = 0; όσο (ι < 2) { χ = "β"; εμφάνισε (α + β); ι = ι + 1; }',
+
+    # The shared α + β raised its TypeError before ρίζα failed
+    'έστω α = 1; έστω β = "β"; εμφάνισε (ρίζα (β), α + β, α + β);'
+]
+
+
+class Outcome:
+    """
+    What running a program on an engine produced
+
+    The global names are only compared when the program finished,
+    after an error the visitor may still be inside of a function's scope
+    """
+
+    def __init__(self, output, names, error):
+        self.output = output
+        self.names = names
+        self.error = error
+
+    def differences(self, other):
+        """
+        Returns the fields in which two outcomes differ
+        """
+
+        return [
+            field for field in ("output", "names", "error")
+            if getattr(self, field) != getattr(other, field)
+        ]
+
+
+def run(engine, source, path):
+    """
+    Runs a program on an engine and returns its Outcome
+    Python exceptions count as errors too, an engine should raise the same ones as the visitor
+    """
+
+    output = io.StringIO()
+    names = error = None
+
+    try:
+        interpreter = engine(source, path)
+
+        with redirect_stdout(output):
+            interpreter.execute()
+
+        names = {
+            name: repr(value) for name, value in interpreter.current_scope.data.items()
+            if not name.startswith("$") and not isinstance(value, Function)
+        }
+
+    except ErmisError as ermis_error:
+        error = (type(ermis_error).__name__, ermis_error.message)
+
+    except Exception as python_error:
+        error = (type(python_error).__name__, str(python_error))
+
+    return Outcome(output.getvalue(), names, error)
+
+def rope_mismatches():
+    """
+    Runs every binary operation and every builtin that takes a string on a long string
+    and on a Rope of the same text, with operands of every type on either side,
+    and returns the descriptions of the ones whose outcomes differ
+    """
+
+    text = "α" * rope_after
+    rope = Rope(text[:10]) + text[10:]
+
+    operands = ["β", 3, 2.5, True, ErmisMap({"κ": 1})]
+    builtins = ["μήκος", "ακέραιος", "ρίζα", "mod", "div"]
+
+    checks = []
+
+    for token_type, operation in binary_operations.items():
+        for operand in operands:
+            checks.append((token_type.name, operation, (operand,), False))
+            checks.append((token_type.name, operation, (operand,), True))
+
+    for name in builtins:
+        checks.append((name, ermis_globals[name], (), False))
+        checks.append((name, ermis_globals[name], (2,), False))
+
+    checks.append(("περιέχει", lambda key: ermis_globals["περιέχει"](ErmisMap({text: 1}), key), (), False))
+    checks.append(("show", show, (), False))
+
+    mismatches = []
+
+    for name, function, others, reflected in checks:
+        outcomes = [
+            outcome(function, (*others, value) if reflected else (value, *others))
+            for value in (text, rope)
+        ]
+
+        if outcomes[0] != outcomes[1]:
+            mismatches.append(f"{name}{' reflected' if reflected else ''} with {others}: {outcomes[0]!r:.60} != {outcomes[1]!r:.60}")
+
+    return mismatches
+
+def operand_rule_mismatches():
+    """
+    Runs every binary operation on values of every type and returns the descriptions
+    of the ones where operations.result_type, which the TypeChecker relies on, is wrong
+    """
+
+    values = [7, 1.5, True, "α", Rope("α") + "β", ErmisMap()]
+    mismatches = []
+
+    for token_type, operation in binary_operations.items():
+        for left in values:
+            for right in values:
+                try:
+                    result = operation(left, right)
+                    actual = str if type(result) is Rope else type(result)
+
+                except Exception:
+                    actual = None
+
+                expected = result_type(token_type, type(left), type(right))
+
+                if actual is not expected:
+                    mismatches.append(
+                        f"{token_type.name} with {type(left).__name__} and {type(right).__name__}: "
+                        f"{getattr(expected, '__name__', None)} != {getattr(actual, '__name__', None)}"
+                    )
+
+    return mismatches
+
+def shared_module_mismatches():
+    """
+    Runs the same program on two interpreters of every kind, which import one module
+    through the same loader, and returns the kinds whose outputs get mixed up
+    """
+
+    library = 'συνάρτηση γράψε (χ) { εμφάνισε ("lib", χ); επέστρεψε χ; }'
+    source = 'εισάγαγε "lib.ermis" ως β; έστω ι = 0; όσο (ι < 3) { β.γράψε (ι); ι = ι + 1; }'
+    expected = "lib 0 \nlib 1 \nlib 2 \n"
+
+    kinds = {
+        "visitor": {},
+        "tiered": {"tier_up_after": 1},
+        "metered": {"tier_up_after": 1, "meter": Meter()}
+    }
+
+    mismatches = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "lib.ermis"), "w", encoding="utf-8") as f:
+            f.write(library)
+
+        for name, options in kinds.items():
+            loader = ModuleLoader(use_disk_cache=False)
+            outputs = []
+
+            for _ in range(2):
+                interpreter = ErmisVisitor(Parser(Lexer(source)), directory=directory, **options)
+                interpreter.modules = loader
+                interpreter.output = io.StringIO()
+                outputs.append(interpreter.output)
+
+                try:
+                    interpreter.execute()
+
+                except ErmisError as error:
+                    outputs[-1].write(error.message)
+
+            printed = [output.getvalue() for output in outputs]
+
+            if printed != [expected, expected]:
+                mismatches.append(f"{name}: {printed!r:.80}")
+
+    return mismatches
+
+def outcome(function, arguments):
+    """
+    The result of a call, with Ropes read as strings, or the kind of error it raised
+    """
+
+    try:
+        result = function(*arguments)
+
+    except ErmisError as error:
+        return ("error", error.message)
+
+    except Exception as error:
+        return ("error", type(error).__name__)
+
+    return str(result) if isinstance(result, Rope) else result
+
+def compare(source, names = None):
+    """
+    Runs a program on the given engines, or on all of them,
+    and returns the engines whose outcome differs from the plain visitor's, with the fields that differ
+    """
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ermis", encoding="utf-8", delete=False) as f:
+        f.write(source)
+
+    try:
+        expected = run(visitor, source, f.name)
+        mismatches = {}
+
+        for name in names or engines:
+            if engines[name] is visitor:
+                continue
+
+            differences = run(engines[name], source, f.name).differences(expected)
+
+            if differences:
+                mismatches[name] = differences
+
+        return mismatches
+
+    finally:
+        os.remove(f.name)
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(prog="python -m Ermis.differential", description="Compares the Ermis engines on random programs")
+    parser.add_argument("--programs", type=int, default=100, help="number of programs to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first program")
+    parser.add_argument("--engines", nargs="+", choices=list(engines), help="engines to compare with the visitor")
+    parser.add_argument("--save", metavar="DIRECTORY", help="saves the programs that found a mismatch")
+    parser.add_argument("--statements", type=int, default=40)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--functions", type=int, default=4)
+    parser.add_argument("--loop-iterations", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+
+    options = parser.parse_args(arguments)
+    failures = 0
+    rope_failures = rope_mismatches()
+    rule_failures = operand_rule_mismatches()
+    module_failures = shared_module_mismatches()
+
+    for mismatch in rope_failures:
+        print(f"rope: {mismatch}")
+
+    for mismatch in rule_failures:
+        print(f"operand rules: {mismatch}")
+
+    for mismatch in module_failures:
+        print(f"shared module: {mismatch}")
+
+    for number, source in enumerate(regressions):
+        mismatches = compare(source, options.engines)
+        failures += bool(mismatches)
+
+        for name, differences in mismatches.items():
+            print(f"regression {number}: {name} differs in {', '.join(differences)}")
+
+    for seed in range(options.seed, options.seed + options.programs):
+        source = generate(
+            seed,
+            statements=options.statements,
+            depth=options.depth,
+            functions=options.functions,
+            loop_iterations=options.loop_iterations,
+            error_rate=options.error_rate
+        )
+
+        mismatches = compare(source, options.engines)
+
+        if not mismatches:
+            continue
+
+        failures += 1
+
+        for name, differences in mismatches.items():
+            print(f"seed {seed}: {name} differs in {', '.join(differences)}")
+
+        if options.save:
+            os.makedirs(options.save, exist_ok=True)
+
+            with open(os.path.join(options.save, f"πρόγραμμα_{seed}.ermis"), "w", encoding="utf-8") as f:
+                f.write(source)
+
+    total = len(regressions) + options.programs
+
+    print(f"{total - failures} of {total} programs agree on every engine")
+
+    return 1 if failures or rope_failures or rule_failures or module_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,79 @@
 from .lexer import Lexer
 from .parser import Parser
 from .visitor import ErmisVisitor
+from .optimizer import Inliner, LoopInvariantMotion, CommonSubexpressions
+from .passes import PassManager, Resolver, TypeChecker, ConstantFolding
 from .utils import clear_console
+import sys
+import os
 
 class Ermis:
-    def __init__(self, source):
-        self.lexer = Lexer(source)
-        self.parser = Parser(self.lexer)
-        self.visitor = ErmisVisitor(self.parser)
+    def __init__(self, source, budget = None, lazy = False, directory = ".", optimize = False, analyze = False, debug = False, **options):
+        """
+        The source can also be a Lexer, such as one streaming a file from Lexer.from_file
+        analyze resolves the names and checks the types of the program before running it
+        The rest of the options are passed to the ErmisVisitor,
+        such as specialize, tier_up_after and metrics
+        """
+
+        self.lexer = source if isinstance(source, Lexer) else Lexer(source)
+        self.parser = Parser(self.lexer, lazy)
+
+        passes = [Resolver(), TypeChecker()] if analyze else []
+
+        if optimize:
+            passes += [ConstantFolding(), Inliner(), LoopInvariantMotion(), CommonSubexpressions()]
+
+        # Debugging reports the memory of every pass as well
+        self.passes = PassManager(passes, trace_memory=debug)
+        self.visitor = ErmisVisitor(self.parser, budget, directory, self.passes, **options)
+
+        # Prints the interpreter's internal statistics after executing
+        self.debug = debug
 
     @classmethod
-    def from_filename(cls, filename):
+    def from_filename(cls, filename, **options):
         """
         Alternative class constructor
         Initializing an Ermis interpreter from a filename
+
+        The file is streamed by the lexer instead of being read all at once
+        """
+
+        return cls(Lexer.from_file(filename), directory=os.path.dirname(filename), **options)
+
+    def check(self):
+        """
+        Parses the whole source, including every function body, without executing it
+        Syntax errors are raised even when the interpreter is lazy
         """
 
-        with open(filename, "r") as f:
-            source = "\n".join(f.readlines())
+        parser = Parser(self.lexer.restart())
 
-            return cls(source)
+        return parser.parse_compound()
 
     def execute(self):
         clear_console()
 
         self.visitor.execute()
 
+        if self.debug:
+            print(self.visitor.cache_report(), file=sys.stderr)
+
+            if self.passes.reports:
+                print(self.passes.report(), file=sys.stderr)
+
+            for compiler_pass in self.passes.passes:
+                if isinstance(compiler_pass, Inliner) and compiler_pass.inlined:
+                    print(compiler_pass.report(), file=sys.stderr)
+
+            if self.visitor.meter is not None:
+                print(self.visitor.meter, file=sys.stderr)
+
+            if self.visitor.metrics is not None:
+                print(self.visitor.metrics, file=sys.stderr)
+
+            for kind, name, count in self.visitor.tier_events:
+                print(f"Compiled {kind} {name} after {count} runs", file=sys.stderr)
+
 
@@ -1,10 +1,38 @@
 from .utils import red
 
 class ErmisError(Exception):
+    # The offset inside the source where the error was found, when it's known
+    pos = None
+
     def __init__(self, message):
+        self.message = message
+
+        super().__init__(message)
+
+    def __reduce__(self):
+        """
+        Errors are rebuilt from their message, since each kind takes different arguments,
+        so they can be raised by one process and caught by another
+        """
+
+        return (restore_error, (type(self), self.message, self.__dict__))
+
+    def report(self):
+        """
+        Prints the error to the user
+        It's used by the command line interface before exiting
+        """
+
+        print(f"""{red("Σφάλμα! Κάτι πήγε στραβά...")} \n{self.message}""")
 
-        print(f"""{red("Σφάλμα! Κάτι πήγε στραβά...")} \n{message}""")
-        exit()
+
+def restore_error(error_type, message, state):
+    error = error_type.__new__(error_type)
+    Exception.__init__(error, message)
+
+    error.__dict__.update(state)
+
+    return error
 
 
 class WrongTokenError(ErmisError):
@@ -14,18 +42,33 @@ class WrongTokenError(ErmisError):
     """
 
     def __init__(self, current_token, expected_type):
+        self.pos = current_token.pos
+
         super().__init__(
             f"Περίμενα σύμβολο τύπου {expected_type}, αλλά πήρα {current_token.type}"
         )
 
 
+class ExpectedExpressionError(ErmisError):
+    """
+    Fires when the parser needs a value, but finds some other symbol
+    """
+
+    def __init__(self, current_token):
+        self.pos = current_token.pos
+
+        super().__init__(f"Περίμενα έκφραση, αλλά πήρα {current_token.type}")
+
+
 class UnexpectedTokenError(ErmisError):
     """
     A special exception to get triggered
     when the lexer encounters an unrecognized token
     """
 
-    def __init__(self, character):
+    def __init__(self, character, pos = None):
+        self.pos = pos
+
         super().__init__(f"Άκειρο σύμβολο <<{character}>>")
 
 
@@ -65,6 +108,141 @@ class AlreadyDefinedError(ErmisError):
         )
 
 
+class MissingKeyError(ErmisError):
+    def __init__(self, key):
+        super().__init__(f"Ο χάρτης δεν έχει το κλειδί <<{key}>>")
+
+
+class OperandTypeError(ErmisError):
+    """
+    Fires when an operation is given operands it doesn't work with,
+    either while the program runs or before, when the types are known in advance
+    """
+
+    type_names = {
+        "int": "ακέραιο",
+        "float": "δεκαδικό",
+        "str": "κείμενο",
+        "Rope": "κείμενο",
+        "bool": "λογική τιμή",
+        "ErmisMap": "χάρτη"
+    }
+
+    def __init__(self, symbol, *types):
+        names = " και ".join(self.type_names.get(kind.__name__, kind.__name__) for kind in types)
+
+        super().__init__(f"Η πράξη <<{symbol}>> δεν γίνεται με {names}!")
+
+
+class NotAMapError(ErmisError):
+    """
+    Fires when indexing, or assigning to a key of, a value that isn't a map
+    """
+
+    def __init__(self):
+        super().__init__("Μόνο οι χάρτες έχουν κλειδιά!")
+
+
+class UnhashableKeyError(ErmisError):
+    def __init__(self):
+        super().__init__("Ένας χάρτης δεν μπορεί να γίνει κλειδί!")
+
+
+class WrongArgumentError(ErmisError):
+    """
+    Fires when a builtin is given a value of a type it doesn't work with
+    """
+
+    def __init__(self, name):
+        super().__init__(
+            f"Η συνάρτηση <<{name}>> δεν δέχεται αυτόν τον τύπο τιμής"
+        )
+
+
+class ParallelIOError(ErmisError):
+    """
+    Fires when a function that talks to the user is given to παράλληλα
+    """
+
+    def __init__(self, name):
+        super().__init__(
+            f"Οι συναρτήσεις που τρέχουν παράλληλα δεν μπορούν να καλέσουν την <<{name}>>"
+        )
+
+
+class ServiceBusyError(ErmisError):
+    """
+    Fires when a program is sent to the execution service while its queue is full
+    """
+
+    def __init__(self, queue_size):
+        super().__init__(
+            f"Η υπηρεσία είναι απασχολημένη, υπάρχουν ήδη {queue_size} προγράμματα σε αναμονή"
+        )
+
+
+class MissingModuleError(ErmisError):
+    def __init__(self, path):
+        super().__init__(f"Δεν βρήκα την ενότητα <<{path}>>")
+
+
+class ForbiddenImportError(ErmisError):
+    """
+    Fires when a program imports a module it isn't allowed to
+    The reason is either "disabled" or "outside", for files outside of the allowed directory
+    """
+
+    messages = {
+        "disabled": "Δεν επιτρέπεται η εισαγωγή ενοτήτων, όπως η <<{}>>",
+        "outside": "Η ενότητα <<{}>> είναι έξω από τον επιτρεπτό φάκελο"
+    }
+
+    def __init__(self, path, reason):
+        self.reason = reason
+
+        super().__init__(self.messages[reason].format(path))
+
+
+class CyclicImportError(ErmisError):
+    """
+    Fires when a module ends up importing itself,
+    either directly or through other modules
+    """
+
+    def __init__(self, names):
+        super().__init__(
+            f"Κυκλική εισαγωγή ενοτήτων: {' -> '.join(names)}"
+        )
+
+
+class ExecutionLimitError(ErmisError):
+    """
+    Fires when a program runs out of its execution budget
+    The limit attribute is one of "steps", "seconds", "depth" or "memory"
+    """
+
+    messages = {
+        "steps": "Το πρόγραμμα ξεπέρασε το όριο βημάτων ({})!",
+        "seconds": "Το πρόγραμμα ξεπέρασε το χρονικό όριο των {} δευτερολέπτων!",
+        "depth": "Το πρόγραμμα ξεπέρασε το όριο βάθους κλήσεων ({})!",
+        "memory": "Το πρόγραμμα ξεπέρασε το όριο μνήμης των {} bytes!"
+    }
+
+    def __init__(self, limit, value):
+        self.limit = limit
+
+        super().__init__(self.messages[limit].format(value))
+
+
+class MemoryQuotaError(ExecutionLimitError):
+    """
+    Fires when the values of a program take more memory than its Meter allows
+    """
+
+    def __init__(self, quota):
+        super().__init__("memory", quota)
+
+
 class FoundReturn(Exception):
     """
     An 'error' that fires whenever a function visitor finds a return block
@@ -75,3 +253,18 @@ class FoundReturn(Exception):
         self.value = value
 
         super().__init__()
+
+
+class Failure:
+    """
+    The error a deferred temporary's expression raised, raised again once the temporary is read
+    Execution limits aren't kept, they stop the program right away
+    """
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        if isinstance(error, ExecutionLimitError):
+            raise error
+
+        self.error = error
@@ -0,0 +1,197 @@
+"""
+A fork server, which launches Ermis programs without paying for Python's startup
+
+The server imports the interpreter once, builds a visitor and optionally runs a prelude
+into its global scope. Every program it's sent over its Unix socket runs in a forked child,
+which starts with all of that already done and streams the program's output back.
+
+Usage: python -m Ermis.forkserver [--socket PATH] [--prelude FILE]
+Programs are sent with the client next to main.py: python client.py program.ermis
+
+Messages in both directions are frames: a kind byte, a 4 byte length and the payload.
+The client sends a request frame with a JSON payload, the server answers with
+output and error frames, followed by an exit frame holding the exit code.
+"""
+
+import argparse
+import traceback
+import signal
+import socket
+import struct
+import json
+import sys
+import io
+import os
+
+from .lexer import Lexer
+from .parser import Parser
+from .visitor import ErmisVisitor
+from .budget import Budget
+from .exceptions import ErmisError
+
+# Imported ahead of time, so the children don't have to
+from . import parallel
+
+default_socket = "/tmp/ermis.sock"
+
+header = struct.Struct("!cI")
+
+def send_frame(connection, kind, payload):
+    connection.sendall(header.pack(kind, len(payload)) + payload)
+
+def receive_frame(connection):
+    """
+    Returns the kind and the payload of the next frame, or (None, None) once the connection closes
+    """
+
+    head = receive_exactly(connection, header.size)
+
+    if head is None:
+        return None, None
+
+    kind, length = header.unpack(head)
+
+    return kind, receive_exactly(connection, length)
+
+def receive_exactly(connection, size):
+    data = b""
+
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+
+        if not chunk:
+            return None
+
+        data += chunk
+
+    return data
+
+
+class FrameStream(io.RawIOBase):
+    """
+    A writable stream that sends everything written to it as frames of one kind
+    """
+
+    def __init__(self, connection, kind):
+        self.connection = connection
+        self.kind = kind
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        send_frame(self.connection, self.kind, bytes(data))
+
+        return len(data)
+
+
+class ForkServer:
+    """
+    Serves programs from a warm visitor, each one in a child process of its own
+    """
+
+    def __init__(self, path = default_socket, prelude = None):
+        self.path = path
+
+        # Everything the children share is prepared here, before any of them is forked
+        self.visitor = ErmisVisitor(None)
+
+        if prelude is not None:
+            self.visitor.parser = Parser(Lexer.from_file(prelude))
+            self.visitor.directory = os.path.dirname(prelude)
+            self.visitor.execute()
+
+    def serve(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+
+        # Children are reaped automatically, and terminating the server removes its socket
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+        try:
+            while True:
+                connection, _ = listener.accept()
+
+                if os.fork() == 0:
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+                    listener.close()
+                    os._exit(self.run_child(connection))
+
+                connection.close()
+
+        finally:
+            listener.close()
+            os.remove(self.path)
+
+    def run_child(self, connection):
+        """
+        Runs the program of a request inside of the forked child and returns the exit code
+        """
+
+        code = 1
+
+        try:
+            kind, payload = receive_frame(connection)
+
+            if kind != b"r":
+                return code
+
+            request = json.loads(payload)
+
+            sys.stdout = io.TextIOWrapper(FrameStream(connection, b"o"), encoding="utf-8", line_buffering=True)
+            sys.stderr = io.TextIOWrapper(FrameStream(connection, b"e"), encoding="utf-8", line_buffering=True)
+            sys.stdin = open(os.devnull)
+
+            code = self.run_program(request)
+
+        except Exception:
+            traceback.print_exc()
+
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            send_frame(connection, b"x", bytes([code]))
+            connection.close()
+
+        return code
+
+    def run_program(self, request):
+        visitor = self.visitor
+
+        visitor.parser = Parser(Lexer(request["source"]))
+        visitor.directory = request.get("directory", ".")
+
+        if request.get("steps") is not None or request.get("seconds") is not None:
+            visitor.enforce_budget(Budget(steps=request.get("steps"), seconds=request.get("seconds")))
+
+        try:
+            visitor.execute()
+
+        except ErmisError as error:
+            error.report()
+
+            return 1
+
+        return 0
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(prog="python -m Ermis.forkserver", description="Runs Ermis programs in warm forked processes")
+    parser.add_argument("--socket", default=default_socket, help="path of the Unix socket to listen on")
+    parser.add_argument("--prelude", help="a program to run once, its names are seen by every program")
+
+    options = parser.parse_args(arguments)
+
+    ForkServer(options.socket, options.prelude).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+Generates random Ermis programs, for differential testing and for benchmark workloads
+
+The programs always parse and always terminate:
+loops count up to a fixed number, recursive functions count a parameter down,
+and functions only call the functions defined before them (or themselves)
+"""
+
+import random
+
+types = ("int", "float", "str", "bool")
+
+words = ("άλφα", "βήτα", "γάμμα", "δέλτα", "Ερμής", "κείμενο", "λέξη", " ", "")
+
+class Scope:
+    """
+    The names a piece of generated code can use, with their types
+    Loop counters can be read but are only ever changed by their loop
+    """
+
+    def __init__(self, indent, variables = ()):
+        self.indent = indent
+        self.variables = dict(variables)
+        self.counters = []
+
+        # Counters are defined at the start of the scope, so loops nested in if statements can use them
+        self.prelude = []
+
+    def of_type(self, value_type):
+        names = [name for name, name_type in self.variables.items() if name_type == value_type]
+
+        if value_type == "int":
+            names += self.counters
+
+        return names
+
+
+class GeneratedFunction:
+    def __init__(self, name, parameters, return_type, recursive, cost):
+        self.name = name
+        self.parameters = parameters
+        self.return_type = return_type
+        self.recursive = recursive
+
+        # Roughly how many statements a call executes
+        self.cost = cost
+
+
+class ProgramGenerator:
+    """
+    Generates a random program out of the grammar the Parser accepts
+
+    statements:      statements of the main program
+    depth:           how deeply if and while statements nest, and how deep expressions get
+    functions:       functions defined before the main program
+    recursion:       whether some of those functions call themselves
+    loop_iterations: the most iterations a single loop runs for
+    max_cost:        the most statements a single statement of the program may end up executing,
+                     which keeps calls inside of loops inside of calls from exploding
+    error_rate:      how often a statement is made to fail while running, by reading an undefined name,
+                     changing a variable's type, missing an argument, dividing by zero
+                     or adding a string and a number
+    """
+
+    def __init__(self, seed = None, statements = 40, depth = 3, functions = 4, recursion = True,
+                 loop_iterations = 8, max_cost = 10_000, error_rate = 0.0):
+
+        self.random = random.Random(seed)
+
+        self.statements = statements
+        self.depth = depth
+        self.function_count = functions
+        self.recursion = recursion
+        self.loop_iterations = loop_iterations
+        self.max_cost = max_cost
+        self.error_rate = error_rate
+
+    def generate(self):
+        """
+        Returns the source of a new program
+        """
+
+        self.counter = 0
+        self.nesting = 0
+        self.functions = []
+        self.return_type = None
+
+        lines = []
+
+        for _ in range(self.function_count):
+            lines += self.function()
+
+        scope = Scope(indent=0)
+
+        self.multiplier, self.cost = 1, 0
+        body = self.block(scope, self.statements, self.depth, nested=False)
+
+        return "\n".join(lines + scope.prelude + body) + "\n"
+
+    def name(self, prefix):
+        # Names are never reused, Ermis scopes are dynamic and a callee would see the caller's names
+        self.counter += 1
+
+        return f"{prefix}{self.counter}"
+
+    def chance(self, probability):
+        return self.random.random() < probability
+
+    def function(self):
+        """
+        Returns the lines of a new function definition
+        Its body can only call the functions defined before it
+        """
+
+        name = self.name("συνάρτηση_")
+        self.return_type = self.random.choice(types)
+        self.multiplier, self.cost = 1, 0
+
+        if self.recursion and self.chance(0.3):
+            return self.recursive_function(name)
+
+        parameters = [(self.name("π"), self.random.choice(types)) for _ in range(self.random.randint(0, 3))]
+        scope = Scope(1, parameters)
+
+        body = self.block(scope, self.random.randint(1, 5), max(1, self.depth - 1), nested=False)
+        body.append(f"    επέστρεψε {self.value(self.return_type, scope, self.depth)};")
+
+        self.functions.append(GeneratedFunction(name, parameters, self.return_type, False, self.cost + 1))
+
+        return [
+            f"συνάρτηση {name} ({', '.join(param for param, _ in parameters)}) {{",
+            *scope.prelude,
+            *body,
+            "}",
+            ""
+        ]
+
+    def recursive_function(self, name):
+        """
+        A recursive function counts its first parameter down to zero
+        It can't define any names, since its second call would find the names of the first
+        """
+
+        counter = self.name("ν")
+        parameters = [(counter, "int")] + [
+            (self.name("π"), self.random.choice(types)) for _ in range(self.random.randint(0, 2))
+        ]
+
+        scope = Scope(1, parameters)
+
+        arguments = [f"{counter} - 1"] + [param for param, _ in parameters[1:]]
+        call = f"{name} ({', '.join(arguments)})"
+
+        match self.return_type:
+            case "int":   step = f"({call} + {self.expression('int', scope, 1)}) % 9973"
+            case "float": step = f"{call} / 2.0 + {self.expression('float', scope, 1)}"
+            case "str":   step = f"{self.expression('str', scope, 1)} + {call}"
+            case "bool":  step = f"{self.expression('bool', scope, 1)} ή {call}"
+
+        base = self.expression(self.return_type, scope, 1)
+
+        # Calls are made with a first argument below 6
+        self.functions.append(GeneratedFunction(name, parameters, self.return_type, True, 6 * (self.cost + 2)))
+
+        return [
+            f"συνάρτηση {name} ({', '.join(param for param, _ in parameters)}) {{",
+            f"    εάν ({counter} < 1) {{",
+            f"        επέστρεψε {base};",
+            "    }",
+            "",
+            f"    επέστρεψε {step};",
+            "}",
+            ""
+        ]
+
+    def block(self, scope, count, depth, nested):
+        """
+        Returns the lines of count statements
+
+        Definitions only happen directly inside of a scope, never inside of an if or a while,
+        so a loop doesn't define a name twice and every name is defined before it's read
+        """
+
+        lines = []
+
+        for _ in range(count):
+            lines += self.statement(scope, depth, nested)
+
+        return lines
+
+    def statement(self, scope, depth, nested):
+        padding = "    " * (scope.indent + self.nesting)
+        self.cost += self.multiplier
+
+        if self.error_rate and self.chance(self.error_rate):
+            return [padding + self.failing_statement(scope)]
+
+        options = ["print", "assignment", "call"]
+
+        if not nested:
+            options += ["definition"] * 3
+
+        if depth > 0:
+            options += ["if", "while"]
+
+        match self.random.choice(options):
+            case "definition":
+                value_type = self.random.choice(types)
+                name = self.name("μ")
+
+                line = f"έστω {name} = {self.value(value_type, scope, self.depth)};"
+                scope.variables[name] = value_type
+
+                return [padding + line]
+
+            case "assignment" if scope.variables:
+                name, value_type = self.random.choice(list(scope.variables.items()))
+                return [f"{padding}{name} = {self.value(value_type, scope, self.depth)};"]
+
+            case "call" if self.affordable():
+                return [padding + self.call(self.random.choice(self.affordable()), scope, self.depth) + ";"]
+
+            case "if":
+                self.nesting += 1
+
+                lines = [f"{padding}εάν ({self.expression('bool', scope, 2)}) {{"]
+                lines += self.block(scope, self.random.randint(1, 3), depth - 1, nested=True)
+
+                if self.chance(0.4):
+                    lines.append(f"{padding}}} αλλιώς {{")
+                    lines += self.block(scope, self.random.randint(1, 3), depth - 1, nested=True)
+
+                if scope.indent and self.chance(0.2):
+                    lines.append(f"{padding}    επέστρεψε {self.value(self.return_type, scope, 1)};")
+
+                self.nesting -= 1
+
+                return lines + [padding + "}"]
+
+            case "while":
+                counter = self.name("ι")
+                iterations = self.random.randint(0, self.loop_iterations)
+
+                scope.prelude.append(f"{'    ' * scope.indent}έστω {counter} = 0;")
+
+                lines = [
+                    f"{padding}{counter} = 0;",
+                    f"{padding}όσο ({counter} < {iterations}) {{"
+                ]
+
+                self.nesting += 1
+                self.multiplier *= max(iterations, 1)
+
+                lines += self.block(scope, self.random.randint(1, 3), depth - 1, nested=True)
+                lines += [f"{padding}    {counter} = {counter} + 1;", padding + "}"]
+
+                self.multiplier //= max(iterations, 1)
+                self.nesting -= 1
+
+                # The counter can be read once its loop is generated
+                scope.counters.append(counter)
+
+                return lines
+
+        arguments = ", ".join(
+            self.expression(self.random.choice(types), scope, 2)
+            for _ in range(self.random.randint(1, 3))
+        )
+
+        return [f"{padding}εμφάνισε ({arguments});"]
+
+    def failing_statement(self, scope):
+        match self.random.choice(("undefined", "type", "arity", "division", "mixed")):
+            case "type" if scope.variables:
+                name, value_type = self.random.choice(list(scope.variables.items()))
+                other = self.random.choice([t for t in types if t != value_type and {t, value_type} != {"int", "float"}])
+
+                return f"{name} = {self.expression(other, scope, 1)};"
+
+            case "arity" if self.functions:
+                function = self.random.choice(self.functions)
+
+                return f"{function.name} ({', '.join(['1'] * (len(function.parameters) + 1))});"
+
+            # Invariant, so an optimizer that moves it out of its loop would fail before the loop's output
+            case "division":
+                return f"εμφάνισε ({self.leaf('int', scope, 0)} / ({self.leaf('int', scope, 0)} * 0));"
+
+            # Invariant as well, and it fails with a TypeError instead of an Ermis error
+            case "mixed":
+                operands = [self.leaf("str", scope, 0), self.leaf(self.random.choice(("int", "float")), scope, 0)]
+                self.random.shuffle(operands)
+
+                return f"εμφάνισε ({operands[0]} {self.random.choice('+-')} {operands[1]});"
+
+        return f"εμφάνισε ({self.name('άγνωστο')});"
+
+    def affordable(self, return_type = None):
+        """
+        The functions that can be called from here without going over max_cost
+        """
+
+        return [
+            function for function in self.functions
+            if function.cost * self.multiplier <= self.max_cost
+            and return_type in (None, function.return_type)
+        ]
+
+    def call(self, function, scope, depth):
+        self.cost += function.cost * self.multiplier
+
+        arguments = [self.value(param_type, scope, depth - 1) for _, param_type in function.parameters]
+
+        # Bounding the depth of the recursion
+        if function.recursive:
+            arguments[0] = f"({arguments[0]}) % 6"
+
+        return f"{function.name} ({', '.join(arguments)})"
+
+    def value(self, value_type, scope, depth):
+        """
+        Returns an expression for a value that gets stored, in a name, a parameter or a return value
+        Stored numbers are kept small, so that numbers built out of them can't grow without bound
+        """
+
+        if value_type == "int":
+            return f"({self.expression('int', scope, depth)}) % 9973"
+
+        return self.expression(value_type, scope, depth)
+
+    def expression(self, value_type, scope, depth):
+        """
+        Returns an expression of the given type
+
+        Divisors are never zero and powers stay small, so expressions can't fail
+        """
+
+        if depth <= 0 or self.chance(0.3):
+            return self.leaf(value_type, scope, depth)
+
+        operand = lambda operand_type = value_type: self.expression(operand_type, scope, depth - 1)
+
+        match value_type:
+            case "int":
+                match self.random.randint(0, 5):
+                    case 0: return f"{operand()} {self.random.choice('+-*')} {operand()}"
+                    case 1: return f"({operand()} {self.random.choice('+-')} {operand()})"
+                    case 2: return f"{operand()} {self.random.choice(('%', '//'))} {self.divisor(scope, depth)}"
+                    case 3: return f"({operand()} % 10) ^ {self.random.randint(0, 3)}"
+                    case 4: return f"-{self.leaf('int', scope, depth)}"
+                    case 5: return f"mod ({operand()}, {self.divisor(scope, depth)})"
+
+            case "float":
+                match self.random.randint(0, 3):
+                    case 0: return f"{operand()} {self.random.choice('+-*')} {operand()}"
+                    case 1: return f"{operand('int')} / {self.divisor(scope, depth)}"
+                    case 2: return f"({operand()} + {operand('int')})"
+                    case 3: return f"ρίζα ({self.float_literal()})"
+
+            # Only one piece may be a name, so a string assigned to itself in a loop grows linearly
+            case "str":
+                pieces = [self.leaf("str", scope, depth)] + [
+                    f'"{self.random.choice(words)}"' for _ in range(self.random.randint(1, 2))
+                ]
+
+                self.random.shuffle(pieces)
+
+                return " + ".join(pieces)
+
+            case "bool":
+                match self.random.randint(0, 3):
+                    case 0:
+                        compared = self.random.choice(("int", "float"))
+                        comparison = self.random.choice(("<", ">", "<=", ">=", "==", "!="))
+
+                        return f"{operand(compared)} {comparison} {operand(compared)}"
+
+                    case 1: return f"{operand('str')} {self.random.choice(('==', '!='))} {operand('str')}"
+                    case 2: return f"{operand()} και {operand()}"
+                    case 3: return f"({operand()} ή {operand()})"
+
+    def divisor(self, scope, depth):
+        if self.chance(0.5):
+            return str(self.random.randint(1, 9))
+
+        return f"(({self.expression('int', scope, depth - 1)}) % 7 + 1)"
+
+    def float_literal(self):
+        return f"{self.random.uniform(0, 10):.2f}"
+
+    def leaf(self, value_type, scope, depth):
+        names = scope.of_type(value_type)
+        functions = self.affordable(value_type)
+
+        if functions and depth > 0 and self.chance(0.15):
+            return self.call(self.random.choice(functions), scope, depth)
+
+        if names and self.chance(0.6):
+            return self.random.choice(names)
+
+        match value_type:
+            case "int":   return str(self.random.randint(0, 20))
+            case "float": return self.float_literal()
+            case "str":   return f'"{self.random.choice(words)}"'
+            case "bool":  return self.random.choice(("Αληθές", "Ψευδές"))
+
+
+def generate(seed = None, **options):
+    """
+    Returns the source of a random program, see ProgramGenerator for the options
+    """
+
+    return ProgramGenerator(seed, **options).generate()
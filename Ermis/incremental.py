@@ -0,0 +1,167 @@
+"""
+Incremental parsing, for editors that parse a file again after every keystroke
+
+A Document splits its source into segments, one for every top level statement,
+each spanning from the statement's first token up to the first token of the next one.
+An edit only lexes and parses the segments it touches, and then the ones after them
+until a statement starts where an old one did. From there on, the old segments
+are kept as they are, with their tokens, their trees and their syntax errors.
+
+The positions stored inside of a segment are the ones it was parsed with,
+Document.position turns them into positions of the current source
+"""
+
+from bisect import bisect_right
+
+from .checker import RecoveringParser
+from .token import TokenTypes
+from .lexer import Lexer
+from .AST import Compound, NOOP
+
+class RecordingLexer(Lexer):
+    """
+    A lexer which keeps every token it returns
+    """
+
+    def __init__(self, source, pos = 0):
+        super().__init__(source, pos)
+
+        self.tokens = []
+
+    def get_next_token(self):
+        token = super().get_next_token()
+
+        if token.type != TokenTypes.EOF:
+            self.tokens.append(token)
+
+        return token
+
+
+class Segment:
+    """
+    A top level statement, along with the tokens and the syntax errors found in its span
+    base is the position the segment started at when it was parsed
+    """
+
+    __slots__ = ("node", "base", "tokens", "errors")
+
+    def __init__(self, node, base, tokens, errors):
+        self.node = node
+        self.base = base
+        self.tokens = tokens
+        self.errors = errors
+
+
+class SegmentParser(RecoveringParser):
+    """
+    Parses the top level statements of a source one at a time, starting at any of them
+    """
+
+    def __init__(self, source, pos):
+        super().__init__(RecordingLexer(source, pos))
+
+    def parse_segment(self):
+        base = self.current_token.pos
+        error_count = len(self.errors)
+
+        node = self.parse_separated_statement(TokenTypes.EOF) or NOOP()
+
+        # The lexer has already read the first token of the next segment
+        tokens = self.lexer.tokens
+        split = len(tokens) - (self.current_token.type != TokenTypes.EOF)
+
+        self.lexer.tokens = tokens[split:]
+
+        return Segment(node, base, tokens[:split], self.errors[error_count:])
+
+
+class Document:
+    """
+    The parsed source of a file that is being edited
+    The number of segments the latest edit parsed is kept in self.reparsed
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+        self.segments, self.starts, _ = self.parse(0, [], 0)
+        self.reparsed = len(self.segments)
+
+    def parse(self, pos, old_starts, delta):
+        """
+        Parses segments from pos until the end of the source, or until a statement starts
+        at one of old_starts moved by delta. Returns the new segments, their starts
+        and the index of the old start they stopped at
+        """
+
+        parser = SegmentParser(self.source, pos)
+        segments, starts = [], []
+        index = 0
+
+        while parser.current_token.type != TokenTypes.EOF:
+            start = parser.current_token.pos
+
+            while index < len(old_starts) and old_starts[index] + delta < start:
+                index += 1
+
+            if index < len(old_starts) and old_starts[index] + delta == start:
+                return segments, starts, index
+
+            segments.append(parser.parse_segment())
+            starts.append(start)
+
+        return segments, starts, len(old_starts)
+
+    def edit(self, start, end, text):
+        """
+        Replaces the source between start and end with text and parses the damaged segments
+
+        The segment before the edit is parsed again as well, since what follows a statement
+        can change its meaning: a new αλλιώς continues the εάν before it
+        """
+
+        self.source = self.source[:start] + text + self.source[end:]
+        delta = len(text) - (end - start)
+
+        first = max(bisect_right(self.starts, start - 1) - 1, 0)
+        last = max(bisect_right(self.starts, end) - 1, 0)
+
+        pos = self.starts[first] if first > 0 else 0
+        following = self.starts[last + 1:]
+
+        segments, starts, synced = self.parse(pos, following, delta)
+        synced += last + 1
+
+        self.segments[first:synced] = segments
+        self.starts[first:] = starts + [old + delta for old in self.starts[synced:]]
+        self.reparsed = len(segments)
+
+    def position(self, index, pos):
+        """
+        The position in the current source of a position stored in a segment
+        """
+
+        return pos - self.segments[index].base + self.starts[index]
+
+    def tree(self):
+        return Compound([segment.node for segment in self.segments] or [NOOP()])
+
+    def tokens(self):
+        """
+        Yields the tokens of the whole source with their current positions, for highlighting
+        """
+
+        for index, segment in enumerate(self.segments):
+            for token in segment.tokens:
+                yield self.position(index, token.pos), token
+
+    def errors(self):
+        """
+        Returns the syntax errors of the whole source with their current positions
+        """
+
+        return [
+            (self.position(index, error.pos) if error.pos is not None else None, error)
+            for index, segment in enumerate(self.segments)
+            for error in segment.errors
+        ]
@@ -1,18 +1,136 @@
 from .exceptions import UnexpectedTokenError
 from .config import tokens, keywords
 from .token import TokenTypes, Token
+import codecs
+import re
+
+# The only symbols that matter when skipping a block of code
+block_symbols = re.compile(r'[{}"]|>>')
+string_end = re.compile('"')
+line_end = re.compile("\n")
+
+
+class SourceReader:
+    """
+    Reads a UTF-8 file in chunks
+
+    Greek letters take two bytes, so a chunk can end in the middle of one
+    The incremental decoder holds on to those bytes until the next chunk
+    """
+
+    def __init__(self, path, chunk_size = 1 << 16):
+        self.path = path
+        self.chunk_size = chunk_size
+
+        self.file = open(path, "rb")
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read(self):
+        """
+        Returns the next chunk of text, or an empty string at the end of the file
+        """
+
+        if self.file.closed:
+            return ""
+
+        while True:
+            data = self.file.read(self.chunk_size)
+            text = self.decoder.decode(data, final = not data)
+
+            if text or not data:
+                break
+
+        if not data:
+            self.file.close()
+
+        return text
+
 
 class Lexer:
-    def __init__(self, source):
+    # The file of a streamed program
+    path = None
+    chunk_size = None
+
+    def __init__(self, source, pos = 0, reader = None):
         """
         Initalizing the Lexer object
         Saving the position and the current character
+
+        A starting position can be given to lex only a part of the source,
+        which is how lazily parsed function bodies are read
+
+        With a reader, the source is only a window of the whole program, which
+        is read further as the lexer advances, see Lexer.from_file
         """
 
         self.source = source
-        self.pos = 0
+        self.pos = pos
+        self.reader = reader
+
+        # The position of the window inside of the whole program
+        self.offset = 0
+
+        # Text after the mark is kept when the window moves, it's the start of the current token
+        self.mark = pos
+
+        self.current_char = self.source[self.pos] if self.pos < len(self.source) else None
 
-        self.current_char = self.source[self.pos]
+    @classmethod
+    def from_file(cls, path, chunk_size = 1 << 16):
+        """
+        Creates a lexer which streams a file, so only a small part of it is ever in memory
+        """
+
+        reader = SourceReader(path, chunk_size)
+
+        lexer = cls(reader.read(), reader=reader)
+        lexer.path, lexer.chunk_size = path, chunk_size
+
+        return lexer
+
+    def restart(self):
+        """
+        Returns a new lexer for the same program, starting from its beginning
+        """
+
+        if self.path is not None:
+            return Lexer.from_file(self.path, self.chunk_size)
+
+        return Lexer(self.source)
+
+    def fill(self):
+        """
+        Reads the next chunk of a streamed program into the window,
+        dropping the text before the mark
+
+        Returns whether there was anything left to read
+        """
+
+        if self.reader is None:
+            return False
+
+        chunk = self.reader.read()
+
+        if not chunk:
+            self.reader = None
+            return False
+
+        keep = self.mark
+
+        self.source = self.source[keep:] + chunk
+        self.offset += keep
+        self.pos -= keep
+        self.mark = 0
+
+        return True
+
+    def text(self, start, end):
+        """
+        Returns the program's text between two positions,
+        which have to be inside of the current window
+        """
+
+        return self.source[start - self.offset:end - self.offset]
 
     def advance(self):
         """
@@ -22,11 +140,11 @@ class Lexer:
 
         self.pos += 1
 
-        if self.has_reached_end():
-            self.current_char = None
+        if self.pos < len(self.source) or self.fill():
+            self.current_char = self.source[self.pos]
 
         else:
-            self.current_char = self.source[self.pos]
+            self.current_char = None
 
     def peek(self, offset = 1):
         """
@@ -34,6 +152,9 @@ class Lexer:
         It's useful for tokens that are made of multiple characters
         """
 
+        if self.pos + offset >= len(self.source):
+            self.fill()
+
         return self.source[min(self.pos + offset, len(self.source) - 1)]
 
     def skip_whitespace(self):
@@ -49,8 +170,8 @@ class Lexer:
         >> This is a comment
         """
 
-        if self.current_char == self.peek() == ">":
-            while self.current_char != "\n":
+        if self.current_char == ">" and self.peek() == ">":
+            while self.current_char is not None and self.current_char != "\n":
                 self.advance()
 
             self.skip_whitespace()
@@ -73,7 +194,7 @@ class Lexer:
         has reached the end of the source file
         """
 
-        return self.pos > len(self.source) - 1
+        return self.pos > len(self.source) - 1 and self.reader is None
 
     def collect_sequence(self, condition, token_type):
         """
@@ -81,13 +202,13 @@ class Lexer:
         It accepts a condition and the requested type of the resulting token
         """
 
-        result = ""
+        self.mark = self.pos
 
         while self.current_char is not None and condition(self.current_char):
-            result += self.current_char
             self.advance()
 
-        return Token(token_type, result)
+        # The value is sliced once, instead of growing one character at a time
+        return Token(token_type, self.source[self.mark:self.pos])
 
     def check_keyword(self, value):
         """
@@ -124,36 +245,31 @@ class Lexer:
 
         return token
 
-    def collect_number_value(self):
+    def skip_digits(self):
         """
-        Collects the value of the current number token
+        Skips the digits of the current number token
         It's a utility function for self.collect_number
         """
 
-        value = ""
-
         while self.current_char and self.current_char.isdigit():
-            value += self.current_char
             self.advance()
 
-        return value
-
     def collect_number(self):
         """
         Collects a number token
         It can either be an integer or a float
         """
 
-        value = self.collect_number_value()
+        self.mark = self.pos
+        self.skip_digits()
 
         if self.current_char == ".":
-            value += self.current_char
             self.advance()
+            self.skip_digits()
 
-            value += self.collect_number_value()
-            return Token(TokenTypes.Float, value)
+            return Token(TokenTypes.Float, self.source[self.mark:self.pos])
 
-        return Token(TokenTypes.Integer, value)
+        return Token(TokenTypes.Integer, self.source[self.mark:self.pos])
 
     def advance_double(self, token_type):
         """
@@ -168,6 +284,66 @@ class Lexer:
 
         return token
 
+    def skip_block(self):
+        """
+        Skips the rest of a block, starting right after its left curly bracket
+        It only looks for brackets, strings and comments, which is much faster than collecting tokens
+
+        Returns the position of the matching right bracket, or None if the block never closes
+        """
+
+        pos = self.pos
+        depth = 1
+
+        while True:
+            match = self.search(block_symbols, pos)
+
+            if match is None:
+                return None
+
+            symbol = match.group()
+            pos = match.end()
+
+            if symbol == "{":
+                depth += 1
+
+            elif symbol == "}":
+                depth -= 1
+
+                if depth == 0:
+                    self.pos = match.start()
+                    self.current_char = symbol
+
+                    return self.offset + self.pos
+
+            else:
+                # Skipping the rest of a string or a comment
+                match = self.search(string_end if symbol == '"' else line_end, pos)
+
+                if match is None:
+                    return None
+
+                pos = match.end()
+
+    def search(self, pattern, pos):
+        """
+        Searches the window for a pattern, starting from pos
+        A streamed program is read further until the pattern is found or the program ends
+        """
+
+        while True:
+            match = pattern.search(self.source, pos)
+
+            if match is not None:
+                return match
+
+            offset = self.offset
+
+            if not self.fill():
+                return None
+
+            pos -= self.offset - offset
+
     def get_next_token(self):
         """
         Returns the next token of the lexer's state
@@ -176,9 +352,25 @@ class Lexer:
         If it has reached the end, it will return an EOF token
         """
 
+        self.mark = self.pos
+
         self.skip_whitespace()
         self.skip_comment()
 
+        self.mark = self.pos
+
+        start = self.offset + self.pos
+        token = self.collect_token()
+        token.pos = start
+
+        return token
+
+    def collect_token(self):
+        """
+        Collects the token starting at the current character
+        It's a utility function for self.get_next_token
+        """
+
         if self.current_char is not None:
             if self.current_char.isdigit():
                 return self.collect_number()
@@ -194,12 +386,13 @@ class Lexer:
                 case "!=": return self.advance_double(TokenTypes.NotEquals)
                 case ">=": return self.advance_double(TokenTypes.GreaterEqual)
                 case "<=": return self.advance_double(TokenTypes.LessEqual)
+                case "//": return self.advance_double(TokenTypes.IntegerDivide)
 
             for character, token_type in tokens.items():
                 if self.current_char == character:
                     return self.advance_token(token_type)
 
-            raise UnexpectedTokenError(self.current_char)
+            raise UnexpectedTokenError(self.current_char, self.offset + self.pos)
 
         return Token(TokenTypes.EOF, "<EOF>")
 
@@ -0,0 +1,87 @@
+from .exceptions import MissingKeyError, NotAMapError, UnhashableKeyError
+from .rope import Rope
+
+class ErmisMap(dict):
+    """
+    An Ermis map, a Python dictionary that prints like Ermis code
+
+    Maps are equal only when they are the same map, like the objects of most languages.
+    So a comparison of two names only changes when the names are bound to other maps,
+    which keeps the optimizer's pure expressions pure
+    """
+
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+
+    # What a Meter charged for the keys stored in the map, the names bound to it in counted scopes,
+    # and whether the charge is part of the meter's current bytes
+    charged = 0
+    bindings = 0
+    held = True
+
+    def __str__(self):
+        return "{" + ", ".join(f"{show(key)}: {show(value)}" for key, value in self.items()) + "}"
+
+    __repr__ = __str__
+
+
+def show(value):
+    """
+    Writes a value the way it's written in Ermis code
+    """
+
+    if isinstance(value, bool):
+        return "Αληθές" if value else "Ψευδές"
+
+    if isinstance(value, (str, Rope)):
+        return f'"{value}"'
+
+    return str(value)
+
+def index(container, key):
+    """
+    Returns the value of a key, it's used for χάρτης[κλειδί]
+    Ropes find the strings they are equal to, since they hash the same way
+    """
+
+    if not isinstance(container, ErmisMap):
+        raise NotAMapError()
+
+    try:
+        return container[key]
+
+    except KeyError:
+        raise MissingKeyError(show(key)) from None
+
+    except TypeError:
+        raise UnhashableKeyError() from None
+
+def store(container, key, value):
+    """
+    Sets the value of a key, it's used for χάρτης[κλειδί] = τιμή
+    Ropes are stored as plain strings, so keys are never long lists of parts
+    """
+
+    if not isinstance(container, ErmisMap):
+        raise NotAMapError()
+
+    if type(key) is Rope:
+        key = str(key)
+
+    try:
+        container[key] = value
+
+    except TypeError:
+        raise UnhashableKeyError() from None
+
+def new_map(entries):
+    """
+    Builds the map of a map literal out of its evaluated keys and values
+    """
+
+    result = ErmisMap()
+
+    for key, value in entries:
+        store(result, key, value)
+
+    return result
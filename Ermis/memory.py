@@ -0,0 +1,277 @@
+"""
+Approximate memory accounting for a single interpreter
+
+A Meter is charged whenever the program binds a value to a name, opens a call frame
+or stores a key in a map, and it's credited when names are bound to smaller values,
+frames are left and keys are removed. The builtins and operators that build large values
+ask the meter first, so a value too large for the quota fails before it's built. Values are measured shallowly, so the numbers
+are estimates: a value bound to two names is counted twice, and the values inside of
+a map are only counted when they are stored through a key assignment
+
+The keys stored in a map are charged to the map itself, which keeps them
+while any name is bound to it. Once the last one is rebound or its frame is left,
+the map and the maps it holds are credited, until a name is bound to it or a key is stored again
+"""
+
+from sys import getsizeof
+
+from .mapping import ErmisMap, store
+from .rope import Rope
+from .operations import binary_operations, text
+from .token import TokenTypes
+from .scope import Module
+from .AST import Function
+from .exceptions import MemoryQuotaError, NotAMapError, UnhashableKeyError
+
+# The cost of a map entry that isn't measured: its slot, a small key and a small value
+entry_size = getsizeof(0) * 2 + 16
+
+missing = object()
+
+# Values whose size never changes, so replacing one with another costs nothing
+fixed_size = {float, bool, type(None), Function, Module}
+
+# Integers smaller than this take the same number of bytes
+small_int = 2 ** 30
+
+# Values that sys.getsizeof can't measure on its own
+measured = {Rope, ErmisMap}
+
+# A rope is charged for the string it becomes once it's read, along with its list of parts
+rope_size = getsizeof("") + getsizeof([])
+
+def map_size(entries):
+    """
+    The approximate number of bytes of a map with a number of small keys and values
+    """
+
+    return getsizeof(ErmisMap()) + entries * entry_size
+
+def repeated_size(string, count):
+    """
+    The approximate number of bytes of a string repeated count times
+    Strings of Greek letters take two bytes for every character
+    """
+
+    string = str(string)
+
+    return getsizeof("") + len(string) * max(count, 0) * (1 if string.isascii() else 2)
+
+def size(value):
+    """
+    The approximate number of bytes a value takes
+    It's constant time for every value, maps included
+    """
+
+    kind = type(value)
+
+    if kind is Rope:
+        return rope_size + value.length + 8 * value.count
+
+    if kind is ErmisMap:
+        return getsizeof(value) + len(value) * entry_size
+
+    return getsizeof(value)
+
+
+class Meter:
+    """
+    Counts the bytes an interpreter holds, current and peak
+    Going over the quota, when there is one, raises a MemoryQuotaError
+
+    Its methods run on every assignment and call, so they measure values
+    with sys.getsizeof directly and only call size for ropes and maps
+    """
+
+    def __init__(self, quota = None):
+        self.quota = quota
+
+        self.current = 0
+        self.peak = 0
+
+        # The operations of counted programs, which the visitor and the compiled code use
+        self.operations = {**binary_operations, TokenTypes.Multiply: self.multiply}
+
+    def charge(self, amount):
+        self.current += amount
+
+        if self.current > self.peak:
+            self.new_peak()
+
+    def new_peak(self):
+        self.peak = self.current
+
+        if self.quota is not None and self.current > self.quota:
+            raise MemoryQuotaError(self.quota)
+
+    def allocate(self, amount):
+        """
+        Called before a value of about amount bytes is built
+        It isn't charged here, the value is charged once it's bound to a name or stored
+        """
+
+        if self.quota is not None and self.current + amount > self.quota:
+            raise MemoryQuotaError(self.quota)
+
+    def multiply(self, left, right):
+        """
+        Replaces the multiplication of counted programs, checking a repeated string before it's built
+        """
+
+        if isinstance(left, text) and type(right) in (int, bool):
+            self.allocate(repeated_size(left, right))
+
+        elif isinstance(right, text) and type(left) in (int, bool):
+            self.allocate(repeated_size(right, left))
+
+        return left * right
+
+    def release(self, amount):
+        self.current -= amount
+
+    def open(self, scope):
+        """
+        Starts counting a scope, which is charged for the copy of the names it's given
+        """
+
+        scope.meter = self
+        scope.charged = amount = getsizeof(scope.data)
+
+        self.current += amount
+
+        if self.current > self.peak:
+            self.new_peak()
+
+    def close(self, scope):
+        """
+        Credits everything a scope was charged for, once it's left
+        """
+
+        self.current -= scope.charged
+
+        for name in scope.map_names:
+            value = scope.data.get(name)
+
+            if type(value) is ErmisMap:
+                self.unbind(value)
+
+    def bind(self, mapping):
+        mapping.bindings += 1
+
+        if not mapping.held:
+            mapping.held = True
+            self.charge(mapping.charged)
+
+    def unbind(self, mapping):
+        """
+        Called when a name stops being bound to a map
+        The last one credits the map's keys, along with the maps it holds that no name is bound to
+        """
+
+        mapping.bindings -= 1
+
+        if mapping.bindings > 0 or not mapping.held:
+            return
+
+        stack = [mapping]
+
+        while stack:
+            mapping = stack.pop()
+            mapping.held = False
+            self.current -= mapping.charged
+
+            stack.extend(
+                value for value in mapping.values()
+                if type(value) is ErmisMap and value.held and not value.bindings
+            )
+
+    def rebind(self, scope, name, old, new):
+        """
+        Called by a counted scope before one of its names is bound to another value
+        The old value is only credited when the enclosing scope isn't holding on to it
+        """
+
+        kind = type(new)
+
+        if kind is type(old):
+            if kind in fixed_size:
+                return
+
+            # Most of the numbers of a program fit in a single digit of a Python integer
+            if kind is int and -small_int < new < small_int and -small_int < old < small_int:
+                return
+
+        amount = size(new) if kind in measured else getsizeof(new)
+
+        # Only the names this scope bound to maps hold on to them
+        if type(old) is ErmisMap and name in scope.map_names:
+            self.unbind(old)
+
+        if kind is ErmisMap:
+            if not scope.map_names:
+                scope.map_names = set()
+
+            scope.map_names.add(name)
+            self.bind(new)
+
+        if old is not None:
+            enclosing = scope.enclosing_scope
+
+            if enclosing is None or enclosing.data.get(name) is not old:
+                amount -= size(old) if type(old) in measured else getsizeof(old)
+
+        if amount:
+            scope.charged += amount
+            self.current += amount
+
+            if self.current > self.peak:
+                self.new_peak()
+
+    def store(self, container, key, value):
+        """
+        Replaces mapping.store for the programs of counted interpreters
+        """
+
+        if not isinstance(container, ErmisMap):
+            raise NotAMapError()
+
+        try:
+            old = container.get(key, missing)
+
+        except TypeError:
+            raise UnhashableKeyError() from None
+
+        amount = size(value) if type(value) in measured else getsizeof(value)
+
+        if old is missing:
+            amount += getsizeof(key) + entry_size
+
+        else:
+            amount -= size(old) if type(old) in measured else getsizeof(old)
+
+        if amount:
+            container.charged += amount
+
+            # A map that no name holds is charged again by the program still using it
+            if container.held:
+                self.charge(amount)
+
+            else:
+                container.held = True
+                self.charge(container.charged)
+
+        store(container, key, value)
+
+    def forget(self, container, key, value):
+        """
+        Credits a key that was removed from a map
+        """
+
+        amount = size(key) + size(value) + entry_size
+        container.charged -= amount
+
+        if container.held:
+            self.release(amount)
+
+    def __str__(self):
+        return f"Memory: {self.current} bytes, peak {self.peak} bytes"
@@ -0,0 +1,215 @@
+"""
+Counters of what the interpreter itself does while it runs a program
+
+A visitor only counts when it's given a Metrics instance. The counting happens in wrappers
+around its handlers, its call and condition methods and its scopes, which are installed by collect_metrics,
+so an interpreter without metrics runs exactly the same code as before and pays nothing for them
+
+The counters can be read from Python, dumped as JSON or in the Prometheus text format,
+and written to a file once the process exits
+"""
+
+from collections import Counter
+import atexit
+import json
+
+from .scope import LocalScope
+from .operations import comparisons
+from .token import TokenTypes
+from .exceptions import FoundReturn
+from .AST import Function, Return, BinaryOperation
+
+# The operators that conditions evaluate in place, without visiting their node
+tested_operators = comparisons | {TokenTypes.And, TokenTypes.Or}
+
+class CountedScope(LocalScope):
+    """
+    A scope that counts its creation and its lookups in the metrics of its class
+    Every Metrics instance makes a subclass of its own, with the metrics attribute set
+    """
+
+    metrics = None
+
+    def __init__(self, scope_name, enclosing_scope = None):
+        self.metrics.scopes += 1
+
+        super().__init__(scope_name, enclosing_scope)
+
+    def find(self, name):
+        """
+        A miss is a name the scope doesn't hold itself,
+        either a name of a module or an undefined one
+        """
+
+        metrics = self.metrics
+        metrics.lookups += 1
+
+        if self.data.get(name) is None:
+            metrics.lookup_misses += 1
+
+        return LocalScope.find(self, name)
+
+
+class Metrics:
+    """
+    The counters of a single interpreter
+
+    nodes:         the AST nodes evaluated, by their type
+    lookups:       the names looked up in a scope, and lookup_misses the ones it didn't hold
+    scopes:        the scopes created, the global one, modules and function frames
+    calls:         the calls of functions and builtins, and builtin_calls the builtins alone
+    returns:       the FoundReturn errors raised by επέστρεψε
+    """
+
+    # The metric names and descriptions of the Prometheus text format
+    descriptions = {
+        "nodes": ("ermis_nodes_evaluated_total", "AST nodes evaluated, by node type"),
+        "lookups": ("ermis_scope_lookups_total", "Names looked up in a scope"),
+        "lookup_misses": ("ermis_scope_lookup_misses_total", "Names looked up that the scope didn't hold"),
+        "scopes": ("ermis_scopes_created_total", "Scopes created"),
+        "calls": ("ermis_calls_total", "Calls of functions and builtins"),
+        "builtin_calls": ("ermis_builtin_calls_total", "Calls of builtins"),
+        "returns": ("ermis_returns_total", "Returns raised as FoundReturn")
+    }
+
+    def __init__(self):
+        self.nodes = Counter()
+        self.lookups = 0
+        self.lookup_misses = 0
+        self.scopes = 0
+        self.calls = 0
+        self.builtin_calls = 0
+        self.returns = 0
+
+        self.scope_type = type("CountedScope", (CountedScope,), {"metrics": self})
+
+    def collect(self, visitor):
+        """
+        Installs the counting wrappers on a visitor
+        Compiled code doesn't go through them, so everything stays on the visitor, as with budgets
+        """
+
+        visitor.tier_up_after = None
+        visitor.scope_type = self.scope_type
+
+        visitor.handlers = {
+            ast_type: self.counting(ast_type, handler) for ast_type, handler in visitor.handlers.items()
+        }
+
+        call = visitor.call
+        resolve_call = visitor.resolve_call
+        test = visitor.test
+        nodes = self.nodes
+
+        # Conditions skip the dispatch for comparisons and και/ή, so those are counted here
+        def counted_test(node):
+            if type(node) is BinaryOperation and node.token.type in tested_operators:
+                nodes["BinaryOperation"] += 1
+
+            return test(node)
+
+        def counted_call(node, parameters):
+            self.calls += 1
+
+            return call(node, parameters)
+
+        def counted_resolve_call(node):
+            function = resolve_call(node)
+
+            if type(function) is Function:
+                return function
+
+            counted = self.counting_builtin(function)
+
+            if node.target is function:
+                node.target = counted
+
+            return counted
+
+        visitor.call = counted_call
+        visitor.resolve_call = counted_resolve_call
+        visitor.test = counted_test
+
+    def counting(self, ast_type, handler):
+        """
+        Wraps the handler of a node type, so that its nodes are counted
+        """
+
+        nodes = self.nodes
+        name = ast_type.__name__
+
+        if ast_type is Return:
+            def counted(visitor, node):
+                nodes[name] += 1
+
+                try:
+                    return handler(visitor, node)
+
+                except FoundReturn:
+                    self.returns += 1
+                    raise
+
+            return counted
+
+        def counted(visitor, node):
+            nodes[name] += 1
+
+            return handler(visitor, node)
+
+        return counted
+
+    def counting_builtin(self, builtin):
+        def counted(*parameters):
+            self.builtin_calls += 1
+
+            return builtin(*parameters)
+
+        return counted
+
+    def as_dict(self):
+        return {
+            "nodes": dict(self.nodes),
+            **{name: getattr(self, name) for name in self.descriptions if name != "nodes"}
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=4)
+
+    def to_prometheus(self):
+        lines = []
+
+        for name, (metric, description) in self.descriptions.items():
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+
+            if name == "nodes":
+                lines.extend(f'{metric}{{type="{kind}"}} {count}' for kind, count in sorted(self.nodes.items()))
+
+            else:
+                lines.append(f"{metric} {getattr(self, name)}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Writes the counters to a file, as JSON when its name ends with .json
+        and in the Prometheus text format otherwise
+        """
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json() if path.endswith(".json") else self.to_prometheus())
+
+    def dump_on_exit(self, path):
+        """
+        Dumps the counters once the process exits, even when the program failed
+        """
+
+        atexit.register(self.dump, path)
+
+    def __str__(self):
+        total = sum(self.nodes.values())
+
+        return (
+            f"Metrics: {total} nodes, {self.lookups} lookups ({self.lookup_misses} misses), "
+            f"{self.scopes} scopes, {self.calls} calls ({self.builtin_calls} builtins), {self.returns} returns"
+        )
@@ -0,0 +1,183 @@
+from hashlib import sha256
+import pickle
+import os
+
+from .exceptions import MissingModuleError, CyclicImportError, ForbiddenImportError
+from .scope import Module
+from .parser import Parser
+from .lexer import Lexer
+from .AST import Function
+
+class ModuleLoader:
+    """
+    Loads .ermis files as modules
+
+    Every module is parsed and executed only once, later imports get the same Module
+    The parsed form of each file is also cached on disk, next to the file itself
+
+    A root directory confines imports to the files inside of it, symbolic links included,
+    and imports = False refuses them altogether
+    """
+
+    cache_directory = "__ermiscache__"
+
+    # Bump whenever the AST classes change, so old caches are ignored
+    cache_version = 2
+
+    def __init__(self, lazy = False, use_disk_cache = True, root = None, imports = True):
+        self.lazy = lazy
+        self.use_disk_cache = use_disk_cache
+        self.root = os.path.realpath(root) if root is not None else None
+        self.imports = imports
+
+        self.modules = {}
+
+        # The paths of the modules currently being executed, used to detect cycles
+        self.loading = []
+
+    def resolve(self, path, directory):
+        """
+        Paths are relative to the importing module,
+        or to the program's directory for the main program
+        """
+
+        if not self.imports:
+            raise ForbiddenImportError(path, "disabled")
+
+        if self.loading:
+            directory = os.path.dirname(self.loading[-1])
+
+        if self.root is None:
+            return os.path.abspath(os.path.join(directory, path))
+
+        resolved = os.path.realpath(os.path.join(directory, path))
+
+        if os.path.commonpath([self.root, resolved]) != self.root:
+            raise ForbiddenImportError(path, "outside")
+
+        return resolved
+
+    def load(self, path, visitor):
+        """
+        Returns the module of the given path, executing it with the visitor if needed
+        """
+
+        path = self.resolve(path, visitor.directory)
+
+        if path in self.modules:
+            return self.modules[path]
+
+        if path in self.loading:
+            chain = self.loading[self.loading.index(path):] + [path]
+
+            raise CyclicImportError([module_name(p) for p in chain])
+
+        if not os.path.isfile(path):
+            raise MissingModuleError(path)
+
+        tree = self.parse(path)
+        scope = visitor.scope_type(scope_name = module_name(path))
+
+        if visitor.meter is not None:
+            visitor.meter.open(scope)
+
+        previous_scope = visitor.current_scope
+        visitor.current_scope = scope
+        self.loading.append(path)
+
+        try:
+            visitor.visit(tree)
+
+        finally:
+            visitor.current_scope = previous_scope
+            self.loading.pop()
+
+        # The module's functions always run inside of the module's scope
+        for value in scope.data.values():
+            if isinstance(value, Function):
+                value.scope = scope
+
+        module = Module(module_name(path), path, scope)
+        self.modules[path] = module
+
+        return module
+
+    def parse(self, path):
+        """
+        Parses a module's file, reusing the cached tree when the file hasn't changed
+        The modification time is checked first and the hash of the source second
+        """
+
+        stat = os.stat(path)
+        cache_path = self.cache_path(path)
+        cached = self.read_cache(cache_path) if self.use_disk_cache else None
+
+        if cached is not None and (cached["mtime"], cached["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return cached["tree"]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        digest = sha256(raw).hexdigest()
+
+        if cached is not None and cached["hash"] == digest:
+            tree = cached["tree"]
+
+        else:
+            tree = Parser(Lexer(raw.decode("utf-8")), self.lazy).parse_compound()
+
+        if self.use_disk_cache:
+            self.write_cache(cache_path, {
+                "version": self.cache_version,
+                "lazy": self.lazy,
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": digest,
+                "tree": tree
+            })
+
+        return tree
+
+    def cache_path(self, path):
+        directory, filename = os.path.split(path)
+
+        return os.path.join(directory, self.cache_directory, filename + "c")
+
+    def read_cache(self, cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+        if cached.get("version") != self.cache_version or cached.get("lazy") != self.lazy:
+            return None
+
+        return cached
+
+    def write_cache(self, cache_path, cached):
+        """
+        Writes the cache atomically, a read-only directory just means no cache
+        """
+
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+            temporary_path = f"{cache_path}.{os.getpid()}"
+
+            with open(temporary_path, "wb") as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temporary_path, cache_path)
+
+        except OSError:
+            pass
+
+
+def module_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# The modules of the current process
+modules = ModuleLoader()
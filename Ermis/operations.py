@@ -0,0 +1,152 @@
+import operator
+
+from .token import TokenTypes
+from .rope import Rope
+from .exceptions import OperandTypeError
+
+# Strings at least this long become Ropes when something is appended to them
+rope_after = 256
+
+# Both kinds of Ermis strings, which count as the same type
+text = (str, Rope)
+
+def promote(left):
+    """
+    Turns a long string into a Rope before something is appended to it,
+    so appending to it in a loop doesn't copy it every time
+    """
+
+    return Rope(left) if len(left) >= rope_after else left
+
+def add(left, right):
+    if type(left) is str:
+        left = promote(left)
+
+    return left + right
+
+def same_type(left, right):
+    """
+    Whether a variable can be assigned a new value
+    """
+
+    return type(left) is type(right) or (isinstance(left, text) and isinstance(right, text))
+
+# Numbers, Python counts booleans as numbers as well
+number_types = {int, float, bool}
+
+# %, // and ^ only work with numbers, Python gives strings a meaning for some of them:
+# % formats a string for example. The checks are written out, so each operator stays a single call
+
+def modulo(left, right):
+    if type(left) in number_types and type(right) in number_types:
+        return left % right
+
+    raise OperandTypeError("%", type(left), type(right))
+
+def floor_divide(left, right):
+    if type(left) in number_types and type(right) in number_types:
+        return left // right
+
+    raise OperandTypeError("//", type(left), type(right))
+
+def power(left, right):
+    if type(left) in number_types and type(right) in number_types:
+        return left ** right
+
+    raise OperandTypeError("^", type(left), type(right))
+
+# The Python operation behind every binary operator, except for the short-circuiting και/ή
+binary_operations = {
+    TokenTypes.Plus:         add,
+    TokenTypes.Minus:        operator.sub,
+    TokenTypes.Multiply:     operator.mul,
+    TokenTypes.Divide:       operator.truediv,
+    TokenTypes.Modulo:       modulo,
+    TokenTypes.IntegerDivide: floor_divide,
+    TokenTypes.Power:        power,
+    TokenTypes.GreaterThan:  operator.gt,
+    TokenTypes.GreaterEqual: operator.ge,
+    TokenTypes.LessThan:     operator.lt,
+    TokenTypes.LessEqual:    operator.le,
+    TokenTypes.NotEquals:    operator.ne,
+    TokenTypes.EqualsEquals: operator.eq
+}
+
+# The operations of specialized nodes, whose operands are known to be numbers unless they are compared
+specialized_operations = {
+    **binary_operations,
+    TokenTypes.Plus: operator.add,
+    TokenTypes.Modulo: operator.mod,
+    TokenTypes.IntegerDivide: operator.floordiv,
+    TokenTypes.Power: operator.pow
+}
+
+comparisons = {
+    TokenTypes.GreaterThan,
+    TokenTypes.GreaterEqual,
+    TokenTypes.LessThan,
+    TokenTypes.LessEqual,
+    TokenTypes.NotEquals,
+    TokenTypes.EqualsEquals
+}
+
+numbers = (int, float)
+
+def result_type(token_type, left, right):
+    """
+    The type of a binary operation's result for the types of its operands,
+    or None when the operation doesn't work with them
+
+    It's the rule table the TypeChecker uses, and binary_operations follows it:
+    an operation raises exactly when its operand types aren't in the table.
+    Powers of integers are integers here, even though negative exponents give floats
+    """
+
+    left = str if left is Rope else left
+    right = str if right is Rope else right
+
+    if token_type in (TokenTypes.EqualsEquals, TokenTypes.NotEquals):
+        return bool
+
+    both_numbers = left in number_types and right in number_types
+
+    if token_type in comparisons:
+        return bool if both_numbers or left is right is str else None
+
+    if both_numbers:
+        if token_type == TokenTypes.Divide or float in (left, right):
+            return float
+
+        return int
+
+    if token_type == TokenTypes.Plus and left is right is str:
+        return str
+
+    if token_type == TokenTypes.Multiply and (left is str and right in (int, bool) or right is str and left in (int, bool)):
+        return str
+
+    return None
+
+def unary_result_type(operand):
+    """
+    The type of +x or -x, or None for operands that have no sign
+    """
+
+    if operand not in number_types:
+        return None
+
+    return float if operand is float else int
+
+def can_specialize(token_type, left_type, right_type):
+    """
+    Whether a binary operation can be specialized for the types of its operands
+    Numbers are specialized for every operation and strings for comparisons
+    """
+
+    if token_type not in binary_operations:
+        return False
+
+    if left_type in numbers and right_type in numbers:
+        return True
+
+    return left_type is right_type is str and token_type in comparisons
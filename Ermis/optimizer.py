@@ -0,0 +1,687 @@
+from copy import deepcopy
+
+from .builtins import ermis_globals
+from .token import Token, TokenTypes
+from .AST import *
+
+def children(node):
+    """
+    Yields the name and the value of every field of a node that holds other nodes
+    Lists of nodes are yielded as they are
+    """
+
+    for name, value in vars(node).items():
+        if isinstance(value, AST) or (isinstance(value, list) and value and isinstance(value[0], AST)):
+            yield name, value
+
+def walk(node):
+    """
+    Yields a node and all of its descendants
+    """
+
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+        yield node
+
+        for _, value in children(node):
+            if isinstance(value, list):
+                stack.extend(value)
+
+            else:
+                stack.append(value)
+
+def transform(node, callback):
+    """
+    Rebuilds a tree from the bottom up
+    The callback receives every node after its children and returns its replacement
+    """
+
+    for name, value in children(node):
+        if isinstance(value, list):
+            setattr(node, name, [transform(child, callback) for child in value])
+
+        else:
+            setattr(node, name, transform(value, callback))
+
+    return callback(node)
+
+def size(node):
+    return sum(1 for _ in walk(node))
+
+
+# The nodes that may appear inside of an inlined expression
+inlinable_nodes = (Number, Float, String, Boolean, Variable, BinaryOperation, UnaryOperation, FunctionCall)
+
+class Inliner:
+    """
+    An optimizer pass which inlines small user functions at their call sites
+
+    A function is inlined when its body is a single return statement,
+    it isn't recursive (not even through other functions) and its expression
+    has at most max_size nodes. The names of the inlined functions,
+    with the number of replaced calls, are kept in self.inlined
+
+    Only literals and plain names are substituted for their parameters. Any other argument
+    is saved in a temporary right before the statement, which keeps it evaluated first and only once,
+    so that is only done for calls that are the first thing their statement evaluates:
+
+    έστω α = φ(β + 1);  becomes  $όρισμα = β + 1;  έστω α = <the body of φ, reading $όρισμα>;
+    """
+
+    def __init__(self, max_size = 12):
+        self.max_size = max_size
+        self.inlined = {}
+        self.counter = 0
+
+    def run(self, tree):
+        self.candidates = self.collect_candidates(tree)
+
+        if not self.candidates:
+            return tree
+
+        # Calls at the top level are only inlined after the function is defined,
+        # calls inside of function bodies run later and can always be inlined
+        defined = set()
+        statements = []
+
+        for statement in tree.children:
+            if isinstance(statement, Function):
+                defined.add(statement.name)
+                allowed = None
+
+            else:
+                allowed = defined
+
+            statement = transform(statement, lambda node: self.visit(node, allowed))
+            statements += self.lower(statement, allowed)
+
+        tree.children = statements
+
+        return tree
+
+    def collect_candidates(self, tree):
+        """
+        Returns the inlinable functions of the program's top level by their names
+        """
+
+        # Names which are also bound by something other than a single function definition
+        definitions = {}
+        rebound = set()
+
+        for node in walk(tree):
+            if isinstance(node, Function):
+                definitions[node.name] = definitions.get(node.name, 0) + 1
+                rebound.update(param.name for param in node.parameters)
+
+            elif isinstance(node, (VariableDefinition, VariableAssignment)):
+                rebound.add(node.name)
+
+            elif isinstance(node, Import):
+                rebound.add(node.name)
+
+        candidates = {}
+
+        for node in tree.children:
+            if not isinstance(node, Function) or isinstance(node.block, LazyBlock):
+                continue
+
+            if definitions[node.name] > 1 or node.name in rebound or node.name in ermis_globals:
+                continue
+
+            statements = [child for child in node.block.children if not isinstance(child, NOOP)]
+
+            if len(statements) != 1 or not isinstance(statements[0], Return):
+                continue
+
+            expression = statements[0].right
+
+            if size(expression) > self.max_size \
+                    or not all(isinstance(child, inlinable_nodes) for child in walk(expression)):
+                continue
+
+            # A copy, since the function's own body is rewritten too
+            candidates[node.name] = (node, deepcopy(expression))
+
+        # Dropping the functions that can reach themselves
+        calls = {
+            name: {child.name for child in walk(expression) if isinstance(child, FunctionCall)}
+            for name, (_, expression) in candidates.items()
+        }
+
+        return {
+            name: candidate for name, candidate in candidates.items()
+            if not reaches(calls, name, name)
+        }
+
+    def visit(self, node, allowed):
+        if isinstance(node, Compound):
+            node.children = [lowered for statement in node.children for lowered in self.lower(statement, allowed)]
+
+            return node
+
+        return self.inline(node, allowed)
+
+    def can_inline(self, node, allowed):
+        if not isinstance(node, FunctionCall) or node.name not in self.candidates:
+            return False
+
+        if allowed is not None and node.name not in allowed:
+            return False
+
+        function, _ = self.candidates[node.name]
+
+        return len(function.parameters) == len(node.parameters)
+
+    def body(self, node):
+        """
+        A copy of the expression of the called function, with the candidates it calls inlined,
+        and the number of times it reads each of its parameters
+        """
+
+        function, expression = self.candidates[node.name]
+        body = transform(deepcopy(expression), self.inline)
+
+        uses = {param.name: 0 for param in function.parameters}
+
+        for child in walk(body):
+            if isinstance(child, Variable) and child.name in uses:
+                uses[child.name] += 1
+
+        return function, body, uses
+
+    def inline(self, node, allowed = None):
+        """
+        Replaces a call to a candidate function with its expression,
+        when every argument can replace its parameter
+        """
+
+        if not self.can_inline(node, allowed):
+            return node
+
+        inlined = dict(self.inlined)
+        function, body, uses = self.body(node)
+
+        arguments = {}
+
+        for param, argument in zip(function.parameters, node.parameters):
+            if not can_substitute(argument, uses[param.name]):
+                self.inlined = inlined
+                return node
+
+            arguments[param.name] = argument
+
+        self.inlined[function.name] = self.inlined.get(function.name, 0) + 1
+
+        return substitute(body, arguments)
+
+    def lower(self, statement, allowed):
+        """
+        Inlines the call that a statement evaluates first, saving its other arguments in temporaries
+        Returns the statements that replace it, with the temporaries in the order of the arguments
+        """
+
+        statements = []
+
+        while True:
+            if isinstance(statement, FunctionCall):
+                holder, field = None, None
+                node = statement
+
+            elif isinstance(statement, (VariableDefinition, VariableAssignment, Return, Temporary)):
+                holder, field = statement, "right"
+                node = first_evaluated(statement.right)
+
+            else:
+                break
+
+            if not self.can_inline(node, allowed):
+                break
+
+            function, body, uses = self.body(node)
+            arguments = {}
+
+            for param, argument in zip(function.parameters, node.parameters):
+                if can_substitute(argument, uses[param.name]):
+                    arguments[param.name] = argument
+                    continue
+
+                name = f"$όρισμα{self.counter}"
+                self.counter += 1
+
+                statements += self.lower(Temporary(name, argument), allowed)
+                arguments[param.name] = temporary(name)
+
+            self.inlined[function.name] = self.inlined.get(function.name, 0) + 1
+            expression = substitute(body, arguments)
+
+            if holder is None:
+                statement = expression
+
+            else:
+                holder.right = replace_node(holder.right, node, expression)
+
+        return statements + [statement]
+
+    def report(self):
+        return "\n".join(
+            f"Inlined {name} {count} times" for name, count in sorted(self.inlined.items())
+        )
+
+
+def can_substitute(argument, uses):
+    """
+    Whether an argument can replace its parameter without changing the program's behaviour
+
+    Literals can be copied any number of times, or dropped,
+    and names of the scope can be read wherever the parameter is used at least once
+    """
+
+    if isinstance(argument, (Number, Float, String, Boolean)):
+        return True
+
+    return isinstance(argument, Variable) and "." not in argument.name and uses >= 1
+
+def substitute(body, arguments):
+    """
+    Replaces the parameters read by an inlined body with their arguments
+    """
+
+    def replace(child):
+        if isinstance(child, Variable) and child.name in arguments:
+            return deepcopy(arguments[child.name])
+
+        return child
+
+    return transform(body, replace)
+
+def first_evaluated(node):
+    """
+    The call an expression evaluates before anything else, or the expression itself
+    Operations evaluate their left side first, so it's found by following them down
+    """
+
+    while True:
+        if isinstance(node, BinaryOperation):
+            node = node.left
+
+        elif isinstance(node, UnaryOperation):
+            node = node.expression
+
+        else:
+            return node
+
+def replace_node(root, old, new):
+    if root is old:
+        return new
+
+    parent = root
+
+    while True:
+        child = parent.left if isinstance(parent, BinaryOperation) else parent.expression
+
+        if child is old:
+            break
+
+        parent = child
+
+    if isinstance(parent, BinaryOperation):
+        parent.left = new
+
+    else:
+        parent.expression = new
+
+    return root
+
+def reaches(calls, start, target):
+    """
+    Whether the function start can end up calling target
+    """
+
+    stack = list(calls.get(start, ()))
+    seen = set()
+
+    while stack:
+        name = stack.pop()
+
+        if name == target:
+            return True
+
+        if name not in seen:
+            seen.add(name)
+            stack.extend(calls.get(name, ()))
+
+    return False
+
+
+# Builtins without side effects, whose calls can be moved or shared
+pure_builtins = {"ρίζα"}
+
+# Operators that fail for some numbers, like a division by zero, or grow without bound
+partial_operators = {TokenTypes.Divide, TokenTypes.IntegerDivide, TokenTypes.Modulo, TokenTypes.Power}
+
+def is_pure(node):
+    """
+    Whether an expression can be evaluated at another time,
+    or fewer times, without changing the program's behaviour
+
+    και/ή are left out, since moving them would evaluate their right side eagerly,
+    and so are the names of modules, which the functions of the module can change.
+    Map lookups and literals aren't pure either, maps change without any name being bound
+    and every literal builds a new map. Operations that can fail on numbers are left out as well,
+    moving them could raise their error before the output of earlier statements
+    """
+
+    for child in walk(node):
+        match child:
+            case Number() | Float() | String() | Boolean():
+                continue
+
+            case Variable() if "." not in child.name:
+                continue
+
+            case TemporaryRead():
+                continue
+
+            case BinaryOperation() if child.token.type not in (TokenTypes.And, TokenTypes.Or) \
+                    and child.token.type not in partial_operators:
+                continue
+
+            case UnaryOperation():
+                continue
+
+            case FunctionCall() if child.name in pure_builtins:
+                continue
+
+        return False
+
+    return True
+
+def calls_impure(node):
+    """
+    Whether evaluating a piece of code calls anything that may have side effects
+    """
+
+    return any(
+        isinstance(child, FunctionCall) and child.name not in pure_builtins
+        for child in walk(node)
+    )
+
+def key(node):
+    """
+    A hashable description of an expression, equal for expressions that compute the same value
+    """
+
+    match node:
+        case Number() | Float() | String() | Boolean():
+            return (type(node).__name__, node.value)
+
+        case Variable() | TemporaryRead():
+            return (type(node).__name__, node.name)
+
+        case BinaryOperation():
+            return ("BinaryOperation", node.token.type, key(node.left), key(node.right))
+
+        case UnaryOperation():
+            return ("UnaryOperation", node.token.type, key(node.expression))
+
+        case FunctionCall():
+            return ("FunctionCall", node.name, tuple(key(param) for param in node.parameters))
+
+def reads(node):
+    return {child.name for child in walk(node) if isinstance(child, (Variable, TemporaryRead))}
+
+def defines(node):
+    """
+    The names a piece of code may bind
+    Called functions get a copy of the scope, so they can't change the caller's names
+    """
+
+    names = set()
+
+    for child in walk(node):
+        if isinstance(child, (VariableDefinition, VariableAssignment, Temporary, Function)):
+            names.add(child.name)
+
+        elif isinstance(child, Import):
+            names.add(child.name or child.path)
+
+    return names
+
+def temporary(name):
+    return Variable(Token(TokenTypes.Identifier, name))
+
+def statement_expressions(statement):
+    """
+    The names of the fields holding the expressions a statement always evaluates
+    """
+
+    match statement:
+        case VariableDefinition() | VariableAssignment() | Return() | Temporary():
+            return ["right"]
+
+        case IndexAssignment():
+            return ["key", "right"]
+
+    return []
+
+def is_operation(node):
+    return isinstance(node, (BinaryOperation, UnaryOperation, FunctionCall))
+
+
+class LoopInvariantMotion:
+    """
+    An optimizer pass which moves loop invariant expressions out of while statements
+
+    An expression is invariant when it's pure and none of the names it reads
+    are bound inside of the loop. Only the loop's condition and the statements
+    at the top of its body are searched, up to the first one that can return,
+    since those run on every iteration, and up to the first call with side effects,
+    since an expression that fails must not fail before the call has happened.
+    The values are computed behind a copy of the loop's condition,
+    so a loop that never runs doesn't evaluate them either:
+
+    όσο (c) { ... }  becomes  εάν (c) { $inv = ...; όσο (c) { ... } }
+
+    A value that fails, like a string added to a number, keeps its error until
+    the loop reaches the expression, so it can't take the place of an earlier statement's error
+    """
+
+    def __init__(self):
+        self.counter = 0
+        self.hoisted = 0
+
+    def run(self, tree):
+        return transform(tree, self.hoist)
+
+    def hoist(self, node):
+        if not isinstance(node, WhileStatement) or not is_pure(node.condition):
+            return node
+
+        variant = defines(node)
+        temporaries = {}
+
+        def replace(expression):
+            if is_operation(expression) and is_pure(expression) and not reads(expression) & variant:
+                expression_key = key(expression)
+
+                if expression_key not in temporaries:
+                    temporaries[expression_key] = Temporary(f"$αμετάβλητο{self.counter}", expression, deferred=True)
+                    self.counter += 1
+
+                return TemporaryRead(temporaries[expression_key].name)
+
+            for name, value in children(expression):
+                if isinstance(value, list):
+                    setattr(expression, name, [replace(child) for child in value])
+
+                else:
+                    setattr(expression, name, replace(value))
+
+            return expression
+
+        guard = deepcopy(node.condition)
+        node.condition = replace(node.condition)
+
+        for statement in node.block.children:
+            if any(isinstance(child, Return) for child in walk(statement)):
+                break
+
+            fields = statement_expressions(statement)
+
+            # A call statement evaluates its parameters before calling
+            if isinstance(statement, FunctionCall):
+                if any(calls_impure(param) for param in statement.parameters):
+                    break
+
+                statement.parameters = [replace(param) for param in statement.parameters]
+
+            elif any(calls_impure(getattr(statement, field)) for field in fields):
+                break
+
+            for field in fields:
+                setattr(statement, field, replace(getattr(statement, field)))
+
+            if calls_impure(statement):
+                break
+
+        if not temporaries:
+            return node
+
+        self.hoisted += len(temporaries)
+
+        return IfStatement(guard, Compound([*temporaries.values(), node]), None)
+
+
+class CommonSubexpressions:
+    """
+    An optimizer pass which computes repeated pure expressions of a statement only once
+
+    α = (β * γ + 1) / (β * γ + 2);  becomes  $κοινό = β * γ;  α = ($κοινό + 1) / ($κοινό + 2);
+
+    The right sides of και/ή are left alone, since they might never run,
+    and so are statements that call anything with side effects, since the shared expressions
+    are computed before the whole statement. Their errors are raised where they are first used
+    """
+
+    def __init__(self):
+        self.counter = 0
+        self.shared = 0
+
+    def run(self, tree):
+        return transform(tree, self.visit_compound)
+
+    def visit_compound(self, node):
+        if not isinstance(node, Compound):
+            return node
+
+        children = []
+
+        for statement in node.children:
+            children += self.share(statement)
+            children.append(statement)
+
+        node.children = children
+
+        return node
+
+    def share(self, statement):
+        """
+        Rewrites a statement in place and returns the temporaries it needs first
+        """
+
+        if isinstance(statement, FunctionCall):
+            roots = [(statement.parameters, index) for index in range(len(statement.parameters))]
+
+        else:
+            roots = [(statement, field) for field in statement_expressions(statement)]
+
+        # Expressions that bind names could change the value of a repeated expression
+        if not roots or any(
+            isinstance(child, (VariableAssignment, VariableDefinition))
+            for holder, field in roots for child in walk(get(holder, field))
+        ):
+            return []
+
+        if any(calls_impure(get(holder, field)) for holder, field in roots):
+            return []
+
+        temporaries = []
+
+        while True:
+            counts = {}
+            sizes = {}
+
+            for holder, field in roots:
+                for expression in always_evaluated(get(holder, field)):
+                    if is_operation(expression) and is_pure(expression):
+                        expression_key = key(expression)
+
+                        counts[expression_key] = counts.get(expression_key, 0) + 1
+                        sizes[expression_key] = size(expression)
+
+            repeated = [k for k, count in counts.items() if count > 1]
+
+            if not repeated:
+                return temporaries
+
+            # The largest repeated expression is shared first, its parts go with it
+            expression_key = max(repeated, key=sizes.get)
+            name = f"$κοινό{self.counter}"
+            self.counter += 1
+            self.shared += 1
+
+            found = []
+
+            def replace(expression):
+                if is_operation(expression) and key(expression) == expression_key:
+                    found.append(expression)
+
+                    return TemporaryRead(name)
+
+                if isinstance(expression, BinaryOperation) and expression.token.type in (TokenTypes.And, TokenTypes.Or):
+                    expression.left = replace(expression.left)
+
+                    return expression
+
+                for field, value in children(expression):
+                    if isinstance(value, list):
+                        setattr(expression, field, [replace(child) for child in value])
+
+                    else:
+                        setattr(expression, field, replace(value))
+
+                return expression
+
+            for holder, field in roots:
+                put(holder, field, replace(get(holder, field)))
+
+            temporaries.append(Temporary(name, found[0], deferred=True))
+
+
+def always_evaluated(node):
+    """
+    Yields the subexpressions of an expression that are evaluated every time,
+    skipping the right sides of και/ή
+    """
+
+    yield node
+
+    if isinstance(node, BinaryOperation) and node.token.type in (TokenTypes.And, TokenTypes.Or):
+        yield from always_evaluated(node.left)
+        return
+
+    for _, value in children(node):
+        for child in (value if isinstance(value, list) else [value]):
+            yield from always_evaluated(child)
+
+def get(holder, field):
+    return holder[field] if isinstance(holder, list) else getattr(holder, field)
+
+def put(holder, field, value):
+    if isinstance(holder, list):
+        holder[field] = value
+
+    else:
+        setattr(holder, field, value)
@@ -0,0 +1,168 @@
+"""
+Runs the calls of the παράλληλα builtin across a pool of processes
+
+Every worker is seeded once, when it starts, with the names the calling scope sees:
+the program's functions, its modules and its variables. Only the arguments of each call
+and its result travel between the processes afterwards. Changes that the calls make
+to maps stay inside of their worker
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .builtins import ermis_globals
+from .mapping import ErmisMap
+from .scope import LocalScope, Module
+from .parser import Parser
+from .optimizer import walk
+from .exceptions import WrongArgumentError, MissingFunctionParameter, ParallelIOError
+from .AST import *
+
+# Builtins that talk to the user, which the functions of παράλληλα can't reach
+io_builtins = {"εμφάνισε", "διάβασε", "περίμενε"}
+
+# The number of worker processes, None meaning one for every CPU
+jobs = None
+
+# Inside of a worker process: its visitor and the function it calls
+worker = None
+worker_function = None
+
+def parallel_map(interpreter, function, arguments):
+    """
+    Calls the function for every value of the arguments map, keeping their order
+
+    A function with more than one parameter is given maps of arguments, whose values are spread.
+    The calls run inside of the interpreter when there's a single CPU or a single call,
+    when the program has a budget, whose limits only hold in this process,
+    and inside of worker processes, which don't start pools of their own
+    """
+
+    if not isinstance(function, Function) or not isinstance(arguments, ErmisMap):
+        raise WrongArgumentError("παράλληλα")
+
+    names = interpreter.current_scope.data
+    builtin = reachable_io(function, names)
+
+    if builtin is not None:
+        raise ParallelIOError(builtin)
+
+    calls = [spread(function, value) for value in arguments.values()]
+    processes = min(jobs or os.cpu_count() or 1, len(calls))
+
+    if processes < 2 or interpreter.budget is not None or worker is not None:
+        results = [call(interpreter, function, parameters) for parameters in calls]
+
+    else:
+        options = {
+            "directory": interpreter.directory,
+            "specialize": interpreter.specialize,
+            "tier_up_after": interpreter.tier_up_after
+        }
+
+        with ProcessPoolExecutor(
+            processes,
+            initializer=start_worker,
+            initargs=(type(interpreter), options, names, function)
+        ) as pool:
+            results = list(pool.map(call_in_worker, calls, chunksize=max(1, len(calls) // (processes * 4))))
+
+    return ErmisMap(zip(arguments.keys(), results))
+
+def spread(function, value):
+    if len(function.parameters) != 1 and isinstance(value, ErmisMap):
+        return list(value.values())
+
+    return [value]
+
+def call(interpreter, function, parameters):
+    """
+    Calls a Function value directly, without looking its name up
+    """
+
+    if len(parameters) != len(function.parameters):
+        raise MissingFunctionParameter(function.name)
+
+    node = FunctionCall(function.name, parameters)
+    node.target = function
+
+    return interpreter.call(node, parameters)
+
+def reachable_io(function, names):
+    """
+    Returns an I/O builtin that a function can end up calling, or None
+    Calls are followed through the functions their names are bound to right now
+    """
+
+    stack = [(function, names)]
+    seen = set()
+
+    while stack:
+        function, names = stack.pop()
+
+        if id(function) in seen:
+            continue
+
+        seen.add(id(function))
+
+        if type(function.block) is LazyBlock:
+            function.block = Parser.parse_lazy_block(function.block)
+
+        # The functions of modules find names inside of their module
+        if function.scope is not None:
+            names = function.scope.data
+
+        for node in walk(function.block):
+            if not isinstance(node, FunctionCall):
+                continue
+
+            if node.name in io_builtins:
+                return node.name
+
+            target = lookup(names, node.name)
+
+            if isinstance(target, Function):
+                stack.append((target, names))
+
+    return None
+
+def lookup(names, name):
+    value = names
+
+    for part in name.split("."):
+        if isinstance(value, Module):
+            value = value.scope.data
+
+        if not isinstance(value, dict):
+            return None
+
+        value = value.get(part)
+
+    return value
+
+
+def start_worker(visitor_class, options, names, function):
+    """
+    Seeds a worker process with the caller's names and the function to call
+    """
+
+    global worker, worker_function
+
+    worker = visitor_class(None, **options)
+    worker.current_scope = LocalScope(scope_name="global")
+    worker.current_scope.data.update(names)
+
+    worker_function = function
+
+    # Guarding against I/O that the names of the program hid from reachable_io
+    for name in io_builtins:
+        ermis_globals[name] = refuse(name)
+
+def refuse(name):
+    def refused(*parameters):
+        raise ParallelIOError(name)
+
+    return refused
+
+def call_in_worker(parameters):
+    return call(worker, worker_function, parameters)
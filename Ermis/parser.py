@@ -1,10 +1,29 @@
-from .exceptions import WrongTokenError
-from .token import TokenTypes
+from .exceptions import WrongTokenError, ExpectedExpressionError
+from .token import TokenTypes, Token
+from .config import operators
+from .lexer import Lexer
 from .AST import *
 
+# The tokens that can start a factor, other than identifiers
+factor_tokens = {
+    TokenTypes.Plus,
+    TokenTypes.Minus,
+    TokenTypes.LeftParen,
+    TokenTypes.LeftCurly,
+    TokenTypes.Integer,
+    TokenTypes.Float,
+    TokenTypes.Bool,
+    TokenTypes.String
+}
+
 class Parser:
-    def __init__(self, lexer):
+    def __init__(self, lexer, lazy = False):
+        """
+        In lazy mode, function bodies are skipped and only parsed on their first call
+        """
+
         self.lexer = lexer
+        self.lazy = lazy
 
         self.current_token = self.lexer.get_next_token()
         self.previous_token = self.current_token
@@ -37,8 +56,7 @@ class Parser:
         results = [self.parse_statement()]
 
         while self.current_token.type != TokenTypes.EOF:
-            if self.previous_token.type != TokenTypes.RightCurly:
-                self.eat(TokenTypes.Semicolon)
+            self.end_statement()
 
             results.append(self.parse_statement())
 
@@ -57,6 +75,7 @@ class Parser:
             case TokenTypes.Return:     return self.parse_return()
             case TokenTypes.If:         return self.parse_if_statement()
             case TokenTypes.While:      return self.parse_while_statement()
+            case TokenTypes.Import:     return self.parse_import()
 
         return NOOP()
 
@@ -77,6 +96,29 @@ class Parser:
 
         return WhileStatement(condition, block)
 
+    def parse_import(self):
+        """
+        Parses an import statement
+        The module's name defaults to the name of its file
+
+        εισάγαγε "βοηθητικά.ermis" ως βοηθ;
+        """
+
+        self.eat(TokenTypes.Import)
+
+        path = self.current_token.value
+        self.eat(TokenTypes.String)
+
+        name = None
+
+        if self.current_token.type == TokenTypes.As:
+            self.eat(TokenTypes.As)
+
+            name = self.current_token.value
+            self.eat(TokenTypes.Identifier)
+
+        return Import(path, name)
+
     def parse_block(self):
         """
         Returns a compound instance
@@ -90,9 +132,7 @@ class Parser:
         block = [self.parse_statement()]
 
         while self.current_token.type != TokenTypes.RightCurly:
-
-            if self.previous_token.type != TokenTypes.RightCurly:
-                self.eat(TokenTypes.Semicolon)
+            self.end_statement()
 
             block.append(self.parse_statement())
 
@@ -100,6 +140,15 @@ class Parser:
 
         return Compound(block)
 
+    def end_statement(self):
+        """
+        Eats the semicolon between two statements
+        It's optional after a right curly bracket, such as the end of a block or of a map
+        """
+
+        if self.previous_token.type != TokenTypes.RightCurly or self.current_token.type == TokenTypes.Semicolon:
+            self.eat(TokenTypes.Semicolon)
+
     def parse_if_statement(self):
         """
         Parses an if statement, including it's false case
@@ -148,13 +197,61 @@ class Parser:
         self.eat(TokenTypes.Function)
 
         name = self.current_token.value
+        pos = self.current_token.pos
         self.eat(TokenTypes.Identifier)
 
         parameters = self.collect_parameters()
 
-        block = self.parse_block()
+        if self.lazy:
+            block = self.skip_block()
+
+        else:
+            block = self.parse_block()
+
+        node = Function(name, parameters, block)
+        node.pos = pos
+
+        return node
+
+    def skip_block(self):
+        """
+        Skips a block of code inside curly brackets without parsing it
+        The lexer jumps straight to the matching right bracket
+        """
+
+        start = self.current_token.pos
+
+        if self.current_token.type != TokenTypes.LeftCurly:
+            raise WrongTokenError(self.current_token, TokenTypes.LeftCurly)
+
+        end = self.lexer.skip_block()
+
+        if end is None:
+            raise WrongTokenError(Token(TokenTypes.EOF, "<EOF>"), TokenTypes.RightCurly)
+
+        # A streamed program doesn't stay in memory, so the body is kept on its own
+        if self.lexer.path is not None:
+            block = LazyBlock(self.lexer.text(start, end + 1), 0)
+
+        else:
+            block = LazyBlock(self.lexer.source, start)
+
+        # The lexer now stands on the right bracket, which is eaten as usual
+        self.current_token = self.lexer.get_next_token()
+        self.eat(TokenTypes.RightCurly)
+
+        return block
 
-        return Function(name, parameters, block)
+    @classmethod
+    def parse_lazy_block(cls, block):
+        """
+        Parses the body of a lazily parsed function
+        Functions defined inside of it will be lazy as well
+        """
+
+        parser = cls(Lexer(block.source, block.start), lazy=True)
+
+        return parser.parse_block()
 
     def parse_return(self):
         """
@@ -163,9 +260,12 @@ class Parser:
         """
 
         self.eat(TokenTypes.Return)
-        value = self.expression()
 
-        return Return(value)
+        # A return without a value
+        if self.current_token.type in (TokenTypes.Semicolon, TokenTypes.RightCurly):
+            return Return()
+
+        return Return(self.expression())
 
     def collect_parameters(self):
         """
@@ -190,13 +290,12 @@ class Parser:
 
         return parameters
 
-    def parse_function_call(self):
+    def parse_function_call(self, name):
         """
         Parses a function call
         Arguments are treated as indivdual expressions and they are seperated by a comma
         """
 
-        name = self.previous_token.value
         parameters = self.collect_parameters()
 
         return FunctionCall(name, parameters)
@@ -211,13 +310,15 @@ class Parser:
 
         self.eat(TokenTypes.Let)
         name = self.current_token.value
+        pos = self.current_token.pos
 
         self.eat(TokenTypes.Identifier)
         self.eat(TokenTypes.Equals)
 
-        right = self.expression()
+        node = VariableDefinition(name, self.expression())
+        node.pos = pos
 
-        return VariableDefinition(name, right)
+        return node
 
     def parse_variable(self):
         """
@@ -230,16 +331,86 @@ class Parser:
         token = self.current_token
         self.eat(TokenTypes.Identifier)
 
+        # Names inside of modules are qualified with dots: module.name
+        while self.current_token.type == TokenTypes.Dot:
+            self.eat(TokenTypes.Dot)
+
+            token = Token(
+                TokenTypes.Identifier,
+                f"{token.value}.{self.current_token.value}",
+                token.pos
+            )
+
+            self.eat(TokenTypes.Identifier)
+
         if self.current_token.type == TokenTypes.Equals:
-            return self.parse_variable_change()
+            node = self.parse_variable_change(token.value)
+            node.pos = token.pos
+
+            return node
 
         # If there's a left parenthesis, it has to be a function call
         if self.current_token.type == TokenTypes.LeftParen:
-            return self.parse_function_call()
+            node = self.parse_function_call(token.value)
 
-        return Variable(token)
+        else:
+            node = Variable(token)
 
-    def parse_variable_change(self):
+        node.pos = token.pos
+
+        return self.parse_index(node)
+
+    def parse_index(self, node):
+        """
+        Parses the keys that follow a value, including a key assignment at the end
+        Example:
+
+        χάρτης["α"]["β"] = 5;
+        """
+
+        while self.current_token.type == TokenTypes.LeftBracket:
+            pos = self.current_token.pos
+
+            self.eat(TokenTypes.LeftBracket)
+            key = self.expression()
+            self.eat(TokenTypes.RightBracket)
+
+            if self.current_token.type == TokenTypes.Equals:
+                self.eat(TokenTypes.Equals)
+
+                node = IndexAssignment(node, key, self.expression())
+                node.pos = pos
+
+                return node
+
+            node = Index(node, key)
+            node.pos = pos
+
+        return node
+
+    def parse_map(self):
+        """
+        Parses a map literal, after its left curly bracket
+        Example:
+
+        {"ένα": 1, "δύο": 2}
+        """
+
+        keys, values = [], []
+
+        while self.current_token.type != TokenTypes.RightCurly:
+            if keys:
+                self.eat(TokenTypes.Comma)
+
+            keys.append(self.expression())
+            self.eat(TokenTypes.Colon)
+            values.append(self.expression())
+
+        self.eat(TokenTypes.RightCurly)
+
+        return MapLiteral(keys, values)
+
+    def parse_variable_change(self, name):
         """
         Parses a variable change statement
         Example:
@@ -247,7 +418,6 @@ class Parser:
         αριθμός = αριθμός + 1;
         """
 
-        name = self.previous_token.value
         self.eat(TokenTypes.Equals)
 
         value = self.expression()
@@ -258,73 +428,108 @@ class Parser:
         """
         Parses an expression factor
 
-        A factor can be a variable, a value, a unary operator
-        or a parenthesised expression
+        A factor can be a variable, a value, a unary operator,
+        a parenthesised expression or a map literal
         """
 
         if self.current_token.type == TokenTypes.Identifier:
             return self.parse_variable()
 
-        self.eat(self.current_token.type)
-        token = self.previous_token
+        token = self.current_token
+
+        if token.type not in factor_tokens:
+            raise ExpectedExpressionError(token)
+
+        self.eat(token.type)
 
         match token.type:
             case TokenTypes.Plus | TokenTypes.Minus:
-                return UnaryOperation(token, self.factor())
+                return UnaryOperation(token, self.power(self.factor()))
 
             case TokenTypes.LeftParen:
                 node = self.expression()
 
                 self.eat(TokenTypes.RightParen)
-                return node
+                return self.parse_index(node)
+
+            case TokenTypes.LeftCurly:
+                return self.parse_index(self.parse_map())
 
             case TokenTypes.Integer: return Number(token)
             case TokenTypes.Float:   return Float(token)
             case TokenTypes.Bool:    return Boolean(token)
             case TokenTypes.String:  return String(token)
 
-    def term(self):
+    def power(self, base):
         """
-        Parses a term
-
-        A term is a combination of factors,
-        connected by a higher order operation such as division or multiplication
+        Combines the operand of a unary operator with the powers that follow it,
+        since powers bind tighter than signs: "-2 ^ 2" means "-(2 ^ 2)"
         """
 
-        node = self.factor()
+        operands = [base]
+        pending = []
 
-        while self.current_token.type in \
-                (TokenTypes.Multiply, TokenTypes.Divide):
+        while self.current_token.type == TokenTypes.Power:
+            self.eat(TokenTypes.Power)
 
-            token = self.current_token
-            self.eat(token.type)
+            pending.append(self.previous_token)
+            operands.append(self.factor())
 
-            node = BinaryOperation(
-                left=node,
-                token=token,
-                right=self.factor()
-            )
+        # Powers are right associative, so they are combined from the right
+        while pending:
+            self.reduce(operands, pending.pop())
 
-        return node
+        return operands[0]
 
     def expression(self):
         """
         Parses an ermis expression
-        An expression is a combination of terms, connected by addition or substraction
+        An expression is a combination of factors, connected by the binary operators of config.operators
+
+        Operators are combined iteratively with an operand and an operator stack,
+        so long expressions don't need a Python call per operator
         """
 
-        node = self.term()
+        operands = [self.factor()]
+        pending = []
 
-        while 15 <= self.current_token.type.value < 25:
+        while self.current_token.type in operators:
             token = self.current_token
+            precedence, associativity = operators[token.type]
+
+            # Combining the pending operators which bind tighter than the new one
+            while pending and self.binds_before(pending[-1], precedence, associativity):
+                self.reduce(operands, pending.pop())
+
             self.eat(token.type)
 
-            node = BinaryOperation(
-                left=node,
-                token=token,
-                right=self.term()
-            )
+            pending.append(token)
+            operands.append(self.factor())
 
-        return node
+        while pending:
+            self.reduce(operands, pending.pop())
+
+        return operands[0]
+
+    def binds_before(self, token, precedence, associativity):
+        """
+        Whether a pending operator should be combined before an operator
+        of the given precedence and associativity is pushed
+        """
+
+        pending_precedence = operators[token.type][0]
+
+        if pending_precedence == precedence:
+            return associativity == "left"
+
+        return pending_precedence > precedence
 
+    def reduce(self, operands, token):
+        right = operands.pop()
+        left = operands.pop()
 
+        operands.append(BinaryOperation(
+            left=left,
+            token=token,
+            right=right
+        ))
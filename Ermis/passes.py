@@ -0,0 +1,347 @@
+"""
+Passes over a parsed program, which run between the parser and the visitor
+
+A pass has a run method that takes the tree and returns it, changed or not.
+Analysis passes raise the first error they find, transform passes return the rewritten tree.
+The optimizer's passes follow the same protocol, so a PassManager can chain all of them
+and report the time each one took and, when asked to, the memory it allocated
+"""
+
+from time import perf_counter
+import tracemalloc
+
+from .utils import Visitor, when
+from .token import Token, TokenTypes
+from .operations import binary_operations, result_type, unary_result_type, rope_after
+from .optimizer import children
+from .mapping import ErmisMap
+from .exceptions import OperandTypeError, NotAMapError
+from .AST import *
+
+class PassReport:
+    """
+    The time a pass took, and when memory is traced, the most bytes it had allocated at once
+    and the bytes it left allocated, None otherwise
+    """
+
+    __slots__ = ("name", "seconds", "peak", "retained")
+
+    def __init__(self, name, seconds, peak = None, retained = None):
+        self.name = name
+        self.seconds = seconds
+        self.peak = peak
+        self.retained = retained
+
+    def __str__(self):
+        report = f"{self.name:<24} {self.seconds * 1000:8.2f} ms"
+
+        if self.peak is None:
+            return report
+
+        return f"{report} {self.peak / 1024:10.1f} KB peak {self.retained / 1024:+10.1f} KB retained"
+
+
+class PassManager:
+    """
+    Runs a list of passes in order, keeping a PassReport for every one of them
+
+    trace_memory measures the memory of every pass with tracemalloc,
+    which makes the passes themselves a few times slower while it's tracing
+    """
+
+    def __init__(self, passes = (), trace_memory = False):
+        self.passes = list(passes)
+        self.reports = []
+        self.trace_memory = trace_memory
+
+    def run(self, tree):
+        if not self.trace_memory:
+            for compiler_pass in self.passes:
+                started = perf_counter()
+                tree = compiler_pass.run(tree)
+
+                self.reports.append(PassReport(type(compiler_pass).__name__, perf_counter() - started))
+
+            return tree
+
+        # Tracing that was already on is left on
+        tracing = tracemalloc.is_tracing()
+
+        if not tracing:
+            tracemalloc.start()
+
+        try:
+            for compiler_pass in self.passes:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                started = perf_counter()
+
+                tree = compiler_pass.run(tree)
+
+                seconds = perf_counter() - started
+                current, peak = tracemalloc.get_traced_memory()
+
+                self.reports.append(PassReport(type(compiler_pass).__name__, seconds, peak - before, current - before))
+
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        return tree
+
+    def report(self):
+        return "\n".join(str(report) for report in self.reports)
+
+
+class Transform(Visitor):
+    """
+    A pass that rewrites the tree through the visitor's dispatch
+    Nodes without a handler keep their place and have their children rewritten
+    """
+
+    def run(self, tree):
+        return self.visit(tree)
+
+    def visit(self, node):
+        handler = self.handlers.get(type(node))
+
+        if handler is None:
+            return self.rewrite_children(node)
+
+        return handler(self, node)
+
+    def rewrite_children(self, node):
+        for name, value in children(node):
+            if isinstance(value, list):
+                setattr(node, name, [self.visit(child) for child in value])
+
+            else:
+                setattr(node, name, self.visit(value))
+
+        return node
+
+
+class Analysis(Visitor):
+    """
+    A pass that inspects the tree through the visitor's dispatch and leaves it as it is
+    Nodes without a handler have their children visited. The errors found are collected
+    with the position of the closest statement or call, and the first one is raised
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.pos = None
+
+    def run(self, tree):
+        self.visit(tree)
+
+        if self.errors:
+            raise self.errors[0]
+
+        return tree
+
+    def visit(self, node):
+        pos = self.pos
+
+        if node.pos is not None:
+            self.pos = node.pos
+
+        handler = self.handlers.get(type(node))
+
+        try:
+            if handler is None:
+                return self.visit_children(node)
+
+            return handler(self, node)
+
+        finally:
+            self.pos = pos
+
+    def visit_children(self, node):
+        for _, value in children(node):
+            for child in (value if isinstance(value, list) else [value]):
+                self.visit(child)
+
+    def error(self, error):
+        error.pos = self.pos
+        self.errors.append(error)
+
+
+# Literal nodes, and the way their values are read
+literals = {
+    Number: lambda node: node.value,
+    Float: lambda node: node.value,
+    String: lambda node: node.value,
+    Boolean: lambda node: node.value == "Αληθές"
+}
+
+def literal(value):
+    """
+    The literal node of a value, or None when the value can't be written as one
+    """
+
+    match value:
+        case bool():
+            return Boolean(Token(TokenTypes.Bool, "Αληθές" if value else "Ψευδές"))
+
+        case int():
+            return Number(Token(TokenTypes.Integer, str(value)))
+
+        case float():
+            return Float(Token(TokenTypes.Float, repr(value)))
+
+        # Longer strings become ropes when they are added to, so they are left to run
+        case str() if len(value) < rope_after:
+            return String(Token(TokenTypes.String, value))
+
+    return None
+
+
+class ConstantFolding(Transform):
+    """
+    Computes the operations whose operands are all literals before the program runs
+
+    Operations that would fail are left in place, so they fail at the same moment as before,
+    and so are powers with large exponents and long repeated strings, which may never run at all
+    """
+
+    max_exponent = 64
+
+    @when(BinaryOperation)
+    def fold_binary_operation(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+
+        operation = binary_operations.get(node.token.type)
+
+        if operation is None or type(node.left) not in literals or type(node.right) not in literals:
+            return node
+
+        left = literals[type(node.left)](node.left)
+        right = literals[type(node.right)](node.right)
+
+        if node.token.type == TokenTypes.Power and not (isinstance(right, int) and abs(right) <= self.max_exponent):
+            return node
+
+        # Repeated strings are only folded while they are short, a long one is left to the program's meter
+        if node.token.type == TokenTypes.Multiply and isinstance(left, str) != isinstance(right, str):
+            text, count = (left, right) if isinstance(left, str) else (right, left)
+
+            if isinstance(count, int) and len(text) * count >= rope_after:
+                return node
+
+        try:
+            value = operation(left, right)
+
+        except (TypeError, ArithmeticError, OperandTypeError):
+            return node
+
+        return literal(value) or node
+
+    @when(UnaryOperation)
+    def fold_unary_operation(self, node):
+        node.expression = self.visit(node.expression)
+
+        if type(node.expression) not in (Number, Float):
+            return node
+
+        value = node.expression.value
+
+        return literal(-value if node.token.type == TokenTypes.Minus else value)
+
+
+class Resolver:
+    """
+    Resolves every name and call of the program before it runs,
+    raising the first undefined name, wrong number of arguments or duplicate definition
+    """
+
+    def __init__(self):
+        self.errors = []
+
+    def run(self, tree):
+        # Imported here, so importing the package doesn't import the checker's command line
+        # before python -m Ermis.checker runs it
+        from .checker import StaticChecker
+
+        self.errors = StaticChecker(tree).check()
+
+        if self.errors:
+            raise min(self.errors, key=lambda error: error.pos if error.pos is not None else -1)
+
+        return tree
+
+
+class TypeChecker(Analysis):
+    """
+    Finds the operations whose operands can never work together, such as "α" - 1
+
+    Ermis names can hold values of any type, so only the types of literals
+    and of the operations between them are known. Every handler returns
+    the type of its expression, or None when it's unknown.
+    The operand types every operator works with come from operations.result_type,
+    the same rules the operations follow while the program runs
+    """
+
+    @when(Number)
+    def check_number(self, node):
+        return int
+
+    @when(Float)
+    def check_float(self, node):
+        return float
+
+    @when(String)
+    def check_string(self, node):
+        return str
+
+    @when(Boolean)
+    def check_boolean(self, node):
+        return bool
+
+    @when(MapLiteral)
+    def check_map_literal(self, node):
+        self.visit_children(node)
+
+        return ErmisMap
+
+    @when(BinaryOperation)
+    def check_binary_operation(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        if node.token.type not in binary_operations or left is None or right is None:
+            return None
+
+        result = result_type(node.token.type, left, right)
+
+        if result is None:
+            self.error(OperandTypeError(node.token.value, left, right))
+
+        return result
+
+    @when(UnaryOperation)
+    def check_unary_operation(self, node):
+        operand = self.visit(node.expression)
+
+        if operand is None:
+            return None
+
+        result = unary_result_type(operand)
+
+        if result is None:
+            self.error(OperandTypeError(node.token.value, operand))
+
+        return result
+
+    @when(Index, IndexAssignment)
+    def check_index(self, node):
+        target = self.visit(node.target)
+
+        if target is not None and target is not ErmisMap:
+            self.error(NotAMapError())
+
+        self.visit(node.key)
+
+        if isinstance(node, IndexAssignment):
+            self.visit(node.right)
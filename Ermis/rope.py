@@ -0,0 +1,113 @@
+from itertools import islice
+
+class Rope:
+    """
+    An Ermis string made of parts, which are only joined when the string is read
+
+    Ropes that extend each other share the same list of parts,
+    each one only covering the first `count` of them.
+    So appending to the newest rope is a single list append, while appending
+    to an older one copies its parts first, leaving the newer ropes untouched
+    """
+
+    __slots__ = ("parts", "count", "length")
+
+    def __init__(self, text = ""):
+        self.parts = [text]
+        self.count = 1
+        self.length = len(text)
+
+    def __add__(self, other):
+        if isinstance(other, str):
+            pieces = (other,)
+
+        elif isinstance(other, Rope):
+            pieces = islice(other.parts, other.count)
+
+        else:
+            return NotImplemented
+
+        parts = self.parts
+
+        if len(parts) != self.count:
+            parts = parts[:self.count]
+
+        parts.extend(pieces)
+
+        rope = Rope.__new__(Rope)
+        rope.parts = parts
+        rope.count = len(parts)
+        rope.length = self.length + len(other)
+
+        return rope
+
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return Rope(other) + self
+
+        return NotImplemented
+
+    # Every other string operation reads the rope as a plain string
+
+    def __mul__(self, other):
+        return str(self) * other
+
+    def __rmul__(self, other):
+        return other * str(self)
+
+    def __str__(self):
+        """
+        Joins the parts of the rope, which then become its only part
+        The shared list is left as it is for the other ropes
+        """
+
+        if self.count > 1:
+            self.parts = ["".join(islice(self.parts, self.count))]
+            self.count = 1
+
+        return self.parts[0]
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __len__(self):
+        return self.length
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (str, Rope)):
+            return self.length == len(other) and str(self) == str(other)
+
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, (str, Rope)):
+            return str(self) < str(other)
+
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, (str, Rope)):
+            return str(self) <= str(other)
+
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, (str, Rope)):
+            return str(self) > str(other)
+
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, (str, Rope)):
+            return str(self) >= str(other)
+
+        return NotImplemented
+
+    def __int__(self):
+        return int(str(self))
+
+    def __float__(self):
+        return float(str(self))
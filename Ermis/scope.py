@@ -1,23 +1,122 @@
+from threading import local
+
 from .exceptions import (
     UndefinedVariableError, 
     AlreadyDefinedError
 )
 
+class Module:
+    """
+    An imported .ermis file
+    Its names live inside of its own scope
+    """
+
+    def __init__(self, name, path, scope):
+        self.name = name
+        self.path = path
+        self.scope = scope
+
+    def __str__(self):
+        return f"Ενότητα({self.name})"
+
+class Binding:
+    """
+    The version of a name that function call sites have cached
+    It changes every time the name is bound to something else
+    """
+
+    __slots__ = ("version",)
+
+    def __init__(self):
+        self.version = 0
+
+
+class Bindings(local):
+    """
+    The watched names of every scope, by name
+    Each thread has its own, so the programs of interpreters running side by side
+    can't invalidate, or fail to invalidate, each other's call sites
+    """
+
+    def __init__(self):
+        self.names = {}
+
+watched = Bindings()
+
+
 class LocalScope:
     """
     A class dedicated to storing variables
     It is used for both global and local scopes
     """
 
+    # The bindings this scope has changed, which change again when the scope is left
+    rebound = ()
+
+    # The Meter counting the memory of the scope's interpreter, what it charged this scope
+    # and the names this scope has bound to maps
+    meter = None
+    charged = 0
+    map_names = ()
+
     def __init__(self, scope_name, enclosing_scope = None):
         self.data = {**enclosing_scope.data} if enclosing_scope is not None else {}
 
         self.scope_name = scope_name
         self.enclosing_scope = enclosing_scope
 
+        if enclosing_scope is not None and enclosing_scope.meter is not None:
+            enclosing_scope.meter.open(self)
+
     def insert(self, name, value):
+        if self.meter is not None:
+            self.meter.rebind(self, name, self.data.get(name), value)
+
         self.data[name] = value
 
+        binding = watched.names.get(name)
+
+        if binding is not None:
+            binding.version += 1
+
+            if not self.rebound:
+                self.rebound = set()
+
+            self.rebound.add(binding)
+
+    def watch(self, name):
+        """
+        Returns the Binding of a name, so that its changes can be noticed
+
+        Scopes copy their enclosing scope, so a name can mean something else
+        once the current scope is left. The scopes that are already open
+        are marked as well, in case they have bound the name before it was watched
+        """
+
+        binding = watched.names.get(name)
+
+        if binding is None:
+            binding = watched.names[name] = Binding()
+            scope = self
+
+            while scope is not None:
+                if not scope.rebound:
+                    scope.rebound = set()
+
+                scope.rebound.add(binding)
+                scope = scope.enclosing_scope
+
+        return binding
+
+    def leave(self):
+        """
+        Called when a function's scope is left
+        The names it has bound go back to their previous meaning
+        """
+
+        for binding in self.rebound:
+            binding.version += 1
+
     def create(self, name, value):
         if name in self.data:
             raise AlreadyDefinedError(name)
@@ -33,10 +132,27 @@ class LocalScope:
         value = self.data.get(name)
 
         if value is None:
+            if "." in name:
+                return self.find_qualified(name)
+
             raise UndefinedVariableError(name)
 
         return value
 
+    def find_qualified(self, name):
+        """
+        Fetches a name from inside of an imported module
+        Example: βοηθ.πρόσθεσε
+        """
+
+        module_name, _, member = name.partition(".")
+        module = self.data.get(module_name)
+
+        if not isinstance(module, Module):
+            raise UndefinedVariableError(name)
+
+        return module.scope.find(member)
+
     def __str__(self):
         return f"Scope({self.scope_name}): {self.data}"
 
@@ -0,0 +1,366 @@
+"""
+An execution service, which runs the programs of many users inside of a single process
+
+Programs wait in a bounded queue and are run by a fixed pool of interpreters,
+each one on a thread of its own. An interpreter is reset before every program,
+so nothing the previous program left behind is seen by the next: its globals,
+its imported modules, its budget or its output. Builtins are shared through ermis_globals,
+which programs can't change, and every program prints into an output of its own
+
+Usage: python -m Ermis.service [--port N] [--interpreters N] [--queue N] [--steps N] [--seconds S] [--memory BYTES]
+                               [--directory PATH] [--no-imports]
+
+POST /run takes {"source": ..., "input": ..., "steps": ..., "seconds": ..., "memory": ...}
+and answers with {"output": ..., "error": ..., "steps": ..., "memory": ..., "queued": ..., "elapsed": ...}
+GET /statistics answers with the throughput and the latency percentiles of the service
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future
+from threading import Thread, Lock
+from time import perf_counter
+from math import ceil
+import argparse
+import queue
+import json
+import io
+
+from .lexer import Lexer
+from .parser import Parser
+from .visitor import ErmisVisitor
+from .modules import ModuleLoader
+from .budget import Budget
+from .memory import Meter
+from .exceptions import ErmisError, ServiceBusyError
+
+class Result:
+    """
+    The outcome of a single program
+    memory is the peak of the bytes its Meter counted,
+    queued and elapsed are the seconds it waited for an interpreter and the seconds it ran for
+    """
+
+    __slots__ = ("output", "error", "steps", "memory", "queued", "elapsed")
+
+    def __init__(self, output, error, steps, memory, queued, elapsed):
+        self.output = output
+        self.error = error
+        self.steps = steps
+        self.memory = memory
+        self.queued = queued
+        self.elapsed = elapsed
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExecutionService:
+    """
+    Runs programs on a pool of reusable interpreters
+
+    steps, seconds and memory are the limits of every program, a request can only lower them.
+    Programs can only import the modules inside of directory, or none at all when imports is False.
+    The rest of the options are passed to the interpreters, such as specialize
+    """
+
+    def __init__(self, interpreters = 4, queue_size = 64, steps = None, seconds = None, memory = None, directory = ".", imports = True, **options):
+        self.max_steps = steps
+        self.max_seconds = seconds
+        self.max_memory = memory
+        self.directory = directory
+        self.imports = imports
+
+        self.pool = queue.SimpleQueue()
+
+        for _ in range(interpreters):
+            self.pool.put(ErmisVisitor(None, **options))
+
+        self.queue_size = queue_size
+        self.requests = queue.Queue(queue_size)
+
+        self.lock = Lock()
+        self.latencies = []
+        self.rejected = 0
+        self.first_request = None
+        self.last_response = None
+
+        self.workers = [Thread(target=self.work, daemon=True) for _ in range(interpreters)]
+
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, source, input = "", steps = None, seconds = None, memory = None):
+        """
+        Queues a program and returns a Future of its Result
+        Raises ServiceBusyError when the queue is full,
+        and TypeError or ValueError when the request itself is malformed
+        """
+
+        check_request(source, input, steps, seconds, memory)
+
+        future = Future()
+        submitted = perf_counter()
+
+        try:
+            self.requests.put_nowait((source, input, steps, seconds, memory, future, submitted))
+
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+
+            raise ServiceBusyError(self.queue_size) from None
+
+        with self.lock:
+            if self.first_request is None:
+                self.first_request = submitted
+
+        return future
+
+    def run(self, source, **options):
+        return self.submit(source, **options).result()
+
+    def work(self):
+        while True:
+            request = self.requests.get()
+
+            # Sent by close
+            if request is None:
+                return
+
+            *program, future, submitted = request
+
+            visitor = self.pool.get()
+
+            try:
+                result = self.execute(visitor, *program, submitted)
+
+            # The worker has to outlive anything a request does, or the pool shrinks
+            # and the request's Future is never resolved
+            except Exception as exception:
+                future.set_exception(exception)
+                continue
+
+            finally:
+                self.pool.put(visitor)
+
+            finished = perf_counter()
+
+            with self.lock:
+                self.latencies.append(finished - submitted)
+                self.last_response = finished
+
+            future.set_result(result)
+
+    def execute(self, visitor, source, input, steps, seconds, memory, submitted):
+        """
+        Runs a program on an interpreter of the pool, which is reset for it first
+        Every program gets a module loader of its own, so modules are executed again for it,
+        and a meter of its own, even without a memory limit. The loader never writes a cache
+        and never reads a file outside of the service's directory
+        """
+
+        output = io.StringIO()
+        error = None
+        budget = meter = None
+
+        started = perf_counter()
+
+        try:
+            steps = lower(steps, self.max_steps)
+            seconds = lower(seconds, self.max_seconds)
+            budget = Budget(steps=steps, seconds=seconds) if steps is not None or seconds is not None else None
+            meter = Meter(lower(memory, self.max_memory))
+
+            loader = ModuleLoader(use_disk_cache=False, root=self.directory, imports=self.imports)
+
+            visitor.reset(Parser(Lexer(source)), budget, self.directory, loader, meter)
+            visitor.output = output
+            visitor.input = io.StringIO(input)
+
+            visitor.execute()
+
+        except ErmisError as exception:
+            error = exception.message
+
+        # Programs can still break the interpreter itself, by recursing too deep for example
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {exception}"
+
+        finally:
+            # Nothing of the program is kept alive by the pooled interpreter
+            visitor.reset(None)
+
+        return Result(
+            output.getvalue(),
+            error,
+            budget.steps if budget is not None else None,
+            meter.peak if meter is not None else None,
+            started - submitted,
+            perf_counter() - started
+        )
+
+    def statistics(self):
+        """
+        Returns the number of finished and rejected programs, the programs finished per second
+        and the percentiles of the seconds between a program's submission and its result
+        """
+
+        with self.lock:
+            latencies = sorted(self.latencies)
+            rejected = self.rejected
+            span = (self.last_response - self.first_request) if latencies else 0
+
+        return {
+            "completed": len(latencies),
+            "rejected": rejected,
+            "throughput": len(latencies) / span if span > 0 else 0.0,
+            **{f"p{p}": percentile(latencies, p) for p in (50, 90, 99)}
+        }
+
+    def close(self):
+        """
+        Stops the workers once the programs already queued have finished
+        """
+
+        for _ in self.workers:
+            self.requests.put(None)
+
+        for worker in self.workers:
+            worker.join()
+
+
+def check_request(source, input, steps, seconds, memory):
+    """
+    Raises TypeError or ValueError unless the program is text and every limit is a positive number or None
+    """
+
+    if not isinstance(source, str) or not isinstance(input, str):
+        raise TypeError("the source and the input of a program must be strings")
+
+    for name, value, types in (("steps", steps, int), ("seconds", seconds, (int, float)), ("memory", memory, int)):
+        if value is None:
+            continue
+
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise TypeError(f"{name} must be a number")
+
+        if not value > 0:
+            raise ValueError(f"{name} must be positive")
+
+def lower(requested, maximum):
+    """
+    The stricter of two limits, either of which can be None
+    """
+
+    if requested is None or maximum is None:
+        return requested if maximum is None else maximum
+
+    return min(requested, maximum)
+
+def percentile(values, p):
+    """
+    The nearest rank percentile of already sorted values
+    """
+
+    if not values:
+        return None
+
+    return values[max(ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Serves an ExecutionService over HTTP, it's given the service by http_server
+    """
+
+    service = None
+
+    def do_POST(self):
+        if self.path != "/run":
+            return self.answer(404, {"error": "not found"})
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            future = self.service.submit(
+                request["source"],
+                request.get("input", ""),
+                request.get("steps"),
+                request.get("seconds"),
+                request.get("memory")
+            )
+
+        except (ValueError, KeyError, TypeError):
+            return self.answer(400, {"error": "bad request"})
+
+        except ServiceBusyError as error:
+            return self.answer(503, {"error": error.message})
+
+        self.answer(200, future.result().as_dict())
+
+    def do_GET(self):
+        if self.path != "/statistics":
+            return self.answer(404, {"error": "not found"})
+
+        self.answer(200, self.service.statistics())
+
+    def answer(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+
+        self.wfile.write(payload)
+
+    def log_message(self, format, *arguments):
+        pass
+
+
+def http_server(service, host = "127.0.0.1", port = 8000):
+    """
+    Returns an HTTP server for the service, port 0 picks any free port
+    """
+
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(prog="python -m Ermis.service", description="Runs the Ermis programs of many users in one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--interpreters", type=int, default=4, help="the number of pooled interpreters")
+    parser.add_argument("--queue", type=int, default=64, help="the number of programs that can wait for an interpreter")
+    parser.add_argument("--steps", type=int, help="the step limit of every program")
+    parser.add_argument("--seconds", type=float, help="the time limit of every program")
+    parser.add_argument("--memory", type=int, help="the memory limit of every program, in bytes")
+    parser.add_argument("--directory", default=".", help="the only directory programs can import modules from")
+    parser.add_argument("--no-imports", dest="imports", action="store_false", help="refuse every import")
+
+    options = parser.parse_args(arguments)
+
+    service = ExecutionService(
+        options.interpreters,
+        options.queue,
+        options.steps,
+        options.seconds,
+        options.memory,
+        options.directory,
+        options.imports
+    )
+    server = http_server(service, options.host, options.port)
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,9 @@ class TokenTypes(Enum):
     Comma        = 9
     Function     = 10
     Return       = 11
+    Modulo       = 12
+    IntegerDivide = 13
+    Power        = 14
 
     GreaterThan  = 15
     GreaterEqual = 16
@@ -34,12 +37,25 @@ class TokenTypes(Enum):
     RightCurly   = 31
     While        = 32
     EOF          = 33
+    Dot          = 34
+    Import       = 35
+    As           = 36
+    LeftBracket  = 38
+    RightBracket = 39
+    Colon        = 40
+
+    # Members are singletons, so hashing them by identity is safe
+    # and much faster than Enum's default, which hashes the member's name
+    __hash__ = object.__hash__
 
 class Token:
-    def __init__(self, token_type, value):
+    def __init__(self, token_type, value, pos = None):
         self.type = token_type
         self.value = value
 
+        # The offset of the token's first character inside the source
+        self.pos = pos
+
     def __str__(self):
         """
         String representation of a string
@@ -1,31 +1,38 @@
 class Visitor:
-    def __init__(self):
-        self.handlers = {}
+    """
+    Dispatches nodes to the methods marked with @when
+
+    The dispatch table is built once for every class, when the class is defined,
+    and it's keyed on the node classes themselves. Subclasses start from the table
+    of their base and can override any of its handlers. Instances share their class's table,
+    an instance that needs different handlers replaces it with a changed copy
+    """
 
-        for function in dir(self):
-            if function.startswith("visit_"):
-                getattr(self, function)()
+    handlers = {}
 
-    def visit(self, node):
-        type_name = type(node).__name__
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
 
-        return self.handlers[type_name](self, node)
+        cls.handlers = dict(cls.handlers)
+
+        for function in vars(cls).values():
+            for ast_type in getattr(function, "ast_types", ()):
+                cls.handlers[ast_type] = function
+
+    def visit(self, node):
+        return self.handlers[type(node)](self, node)
 
 def when(*parameters):
     """
     A utility decorator for the visitor class
 
-    It saves the decorated function into the visitor's handlers,
-    which will then fire when it encounter a node of type ast_type
+    It marks the decorated method as the handler of the given node classes,
+    which the visitor class registers when it's created
     """
 
     def decorator(function):
-        def wrapper(self, **kwargs):
-            for ast_type in parameters:
-                type_name = ast_type.__name__
-
-                self.handlers[type_name] = function
+        function.ast_types = parameters
 
-        return wrapper
+        return function
 
     return decorator
@@ -1,26 +1,189 @@
-from .builtins import ermis_globals
+from functools import partial
+
+from .builtins import ermis_globals, interpreter_builtins
 from .token import TokenTypes
-from .scope import LocalScope
+from .scope import LocalScope, watched
+from .parser import Parser
+from .modules import modules
+from .operations import binary_operations, specialized_operations, can_specialize, same_type
+from .mapping import index, store, new_map
+from .compiler import Compiler
+from .passes import PassManager
 from .utils import Visitor, when
 from .exceptions import *
 from .AST import *
 
 class ErmisVisitor(Visitor):
-    def __init__(self, parser):
+    # Executions with the same operand types before an operation specializes itself
+    specialize_after = 8
+
+    # Failed guards before an operation stays generic for good
+    max_specialization_failures = 3
+
+    def __init__(self, parser, budget = None, directory = ".", passes = (), specialize = False, tier_up_after = None, meter = None, metrics = None):
+        self.parser = parser
+        self.current_scope = None
+        self.budget = None
+
+        # Counts the memory of the program's scopes and maps, when it's given
+        self.meter = meter
+        self.store = store if meter is None else meter.store
+        self.operations = binary_operations if meter is None else meter.operations
+
+        # The class of the program's scopes, which Metrics replaces to count them
+        self.scope_type = LocalScope
+        self.metrics = None
+
+        # Analysis and optimizer passes, which check and rewrite the parsed program before it runs
+        self.passes = passes if isinstance(passes, PassManager) else PassManager(passes)
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Functions and loops are compiled after this many calls or iterations,
+        # None keeps everything on the visitor
+        self.tier_up_after = tier_up_after
+        self.compiler = Compiler(self)
+        self.tier_events = []
+
+        # The compiled functions and loops by their nodes. Compiled code calls back into the visitor
+        # that compiled it, and nodes are shared with other interpreters through imported modules
+        self.compiled = {}
+
+        # The builtins that are given the interpreter, bound to this one
+        self.bound_builtins = {name: partial(ermis_globals[name], self) for name in interpreter_builtins}
+        self.on_tier_up = None
+
+        # Imports are relative to the program's directory
+        self.directory = directory
+        self.modules = modules
+
+        # Streams for εμφάνισε and διάβασε, None meaning the standard ones
+        self.output = None
+        self.input = None
+
+        self.specialize = specialize
+
+        # The class's handlers are shared, so the ones these options replace are set on a copy
+        if specialize or tier_up_after is not None:
+            self.handlers = dict(self.handlers)
+
+        if specialize:
+            self.handlers[BinaryOperation] = ErmisVisitor.profile_binary_operation
+
+        if tier_up_after is not None:
+            self.handlers[WhileStatement] = ErmisVisitor.tiered_while_statement
+
+        # Kept for reset, since budgets replace some of them
+        self.initial_handlers = self.handlers
+        self.initial_tier_up_after = tier_up_after
+
+        if budget is not None:
+            self.enforce_budget(budget)
+
+        if metrics is not None:
+            self.collect_metrics(metrics)
+
+    def reset(self, parser, budget = None, directory = ".", loader = None, meter = None):
+        """
+        Prepares a visitor that has already run a program for another one
+        Nothing that the previous program left behind is seen by the next:
+        its globals, its budget, its meter, its streams, its imported modules
+        and the names its call sites watched on this thread
+        """
+
         self.parser = parser
         self.current_scope = None
 
-        super().__init__()
+        self.budget = None
+        self.handlers = self.initial_handlers
+        self.tier_up_after = self.initial_tier_up_after
+        self.scope_type = LocalScope
+        self.metrics = None
+
+        for name in ("visit", "call", "resolve_call", "test"):
+            self.__dict__.pop(name, None)
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.tier_events = []
+        self.compiled = {}
+
+        # The names watched for the previous program's call sites, which would pile up otherwise
+        watched.names.clear()
+
+        self.directory = directory
+        self.modules = loader or modules
+
+        self.output = None
+        self.input = None
+
+        self.meter = meter
+        self.store = store if meter is None else meter.store
+        self.operations = binary_operations if meter is None else meter.operations
+
+        if budget is not None:
+            self.enforce_budget(budget)
 
     def execute(self):
         """
         Executes the parser and creates a Program instance
         """
 
-        data = self.parser.parse_compound()
+        data = self.passes.run(self.parser.parse_compound())
         program = Program(data)
 
-        return self.visit(program)
+        if self.budget is None:
+            return self.visit(program)
+
+        self.budget.start()
+
+        try:
+            return self.visit(program)
+
+        finally:
+            self.budget.stop()
+
+    def enforce_budget(self, budget):
+        """
+        Limits the execution of the program with a Budget instance
+
+        The counting versions of visit and of the function call handler
+        are only installed here, so unlimited programs don't pay for them
+        """
+
+        self.budget = budget
+        self.visit = self.budgeted_visit
+
+        # Compiled code doesn't count its steps, so everything stays on the visitor
+        self.tier_up_after = None
+
+        call_handler = self.handlers[FunctionCall]
+
+        def budgeted_call(self, node):
+            budget.enter_call()
+
+            try:
+                return call_handler(self, node)
+
+            finally:
+                budget.exit_call()
+
+        self.handlers = {**self.handlers, FunctionCall: budgeted_call}
+
+    def collect_metrics(self, metrics):
+        """
+        Counts what the interpreter does into a Metrics instance
+        Like budgets, the counting code is only installed here
+        """
+
+        self.metrics = metrics
+        metrics.collect(self)
+
+    def budgeted_visit(self, node):
+        self.budget.step()
+
+        return self.handlers[type(node)](self, node)
 
 
     @when(Program)
@@ -32,11 +195,14 @@ class ErmisVisitor(Visitor):
         and then visit the compound containing all of the source's code
         """
 
-        global_scope = LocalScope(
+        global_scope = self.scope_type(
             scope_name = "global",
             enclosing_scope = self.current_scope
         )
 
+        if self.meter is not None and global_scope.meter is None:
+            self.meter.open(global_scope)
+
         self.current_scope = global_scope
         self.visit(node.data)
 
@@ -73,6 +239,13 @@ class ErmisVisitor(Visitor):
         self.current_scope.insert(node.name, node)
 
 
+    @when(Import)
+    def visit_import(self, node):
+        module = self.modules.load(node.path, self)
+
+        self.current_scope.insert(node.name or module.name, module)
+
+
     @when(Return)
     def visit_return(self, node):
         """
@@ -105,12 +278,57 @@ class ErmisVisitor(Visitor):
         if variable is None:
             raise UndefinedVariableError(node.name)
 
-        if type(variable) != type(new_value):
+        if not same_type(variable, new_value):
             raise WrongTypeError(node.name)
 
         self.current_scope.insert(node.name, new_value)
 
 
+    @when(MapLiteral)
+    def visit_map_literal(self, node):
+        return new_map(
+            (self.visit(key), self.visit(value)) for key, value in zip(node.keys, node.values)
+        )
+
+
+    @when(Index)
+    def visit_index(self, node):
+        """
+        Looks a key up inside of a map, in constant time
+        """
+
+        return index(self.visit(node.target), self.visit(node.key))
+
+
+    @when(IndexAssignment)
+    def visit_index_assignment(self, node):
+        self.store(self.visit(node.target), self.visit(node.key), self.visit(node.right))
+
+
+    @when(Temporary)
+    def visit_temporary(self, node):
+        if not node.deferred:
+            return self.current_scope.insert(node.name, self.visit(node.right))
+
+        try:
+            value = self.visit(node.right)
+
+        except Exception as error:
+            value = Failure(error)
+
+        self.current_scope.insert(node.name, value)
+
+
+    @when(TemporaryRead)
+    def visit_temporary_read(self, node):
+        value = self.current_scope.find(node.name)
+
+        if type(value) is Failure:
+            raise value.error
+
+        return value
+
+
     @when(Variable)
     def visit_variable(self, node):
         """
@@ -123,9 +341,7 @@ class ErmisVisitor(Visitor):
 
     @when(IfStatement)
     def visit_if_statement(self, node):
-        condition = self.visit(node.condition)
-
-        if (condition):
+        if self.test(node.condition):
             self.visit(node.block)
 
         elif node.else_block is not None:
@@ -135,38 +351,74 @@ class ErmisVisitor(Visitor):
     @when(WhileStatement)
     def visit_while_statement(self, node):
 
-        while (self.visit(node.condition)):
+        while self.test(node.condition):
             self.visit(node.block)
 
 
+    def test(self, node):
+        """
+        Evaluates the condition of an if or a while statement
+
+        Only its truth matters, so logic operators become plain branches
+        and comparisons are evaluated in place, without visiting the operation itself
+        """
+
+        if type(node) is not BinaryOperation:
+            return self.visit(node)
+
+        match node.token.type:
+            case TokenTypes.And:          return self.test(node.left) and self.test(node.right)
+            case TokenTypes.Or:           return self.test(node.left) or self.test(node.right)
+            case TokenTypes.GreaterThan:  return self.visit(node.left) > self.visit(node.right)
+            case TokenTypes.GreaterEqual: return self.visit(node.left) >= self.visit(node.right)
+            case TokenTypes.LessThan:     return self.visit(node.left) < self.visit(node.right)
+            case TokenTypes.LessEqual:    return self.visit(node.left) <= self.visit(node.right)
+            case TokenTypes.NotEquals:    return self.visit(node.left) != self.visit(node.right)
+            case TokenTypes.EqualsEquals: return self.visit(node.left) == self.visit(node.right)
+
+        return self.visit(node)
+
+
     @when(FunctionCall)
     def visit_function_call(self, node):
         """
         Visits a function call
 
         It will visit each parameter and then process the call
-        Before executing, it will first check if it's a builtin method
+        The called builtin or function is cached by the call site,
+        until the name it was found with is bound to something else
         """
 
-        parameters = list(map(self.visit, node.parameters))
+        return self.call(node, list(map(self.visit, node.parameters)))
 
-        # Searching for a builtin method
-        builtin = ermis_globals.get(node.name)
+    def call(self, node, parameters):
+        """
+        Calls the builtin or function of a call site with already visited parameters
+        It's shared by the visitor and the compiled code
+        """
 
-        if builtin is not None:
-            return builtin(*parameters)
+        function = node.target
 
-        # Creating the function's scope
-        function = self.current_scope.find(node.name)
+        if function is None or (node.binding is not None and node.binding.version != node.version):
+            function = self.resolve_call(node)
 
-        function_scope = LocalScope(
+        else:
+            self.cache_hits += 1
+
+        if type(function) is not Function:
+            return function(*parameters)
+
+        if type(function.block) is LazyBlock:
+            function.block = Parser.parse_lazy_block(function.block)
+
+        # Functions of modules run inside of their module's scope
+        caller_scope = self.current_scope
+
+        function_scope = self.scope_type(
             scope_name = node.name,
-            enclosing_scope = self.current_scope
+            enclosing_scope = function.scope or caller_scope
         )
 
-        if len(function.parameters) != len(node.parameters):
-            raise MissingFunctionParameter(function.name)
-
         for argument, param in zip(parameters, function.parameters):
             function_scope.insert(param.name, argument)
 
@@ -174,16 +426,128 @@ class ErmisVisitor(Visitor):
         return_value = None
 
         try:
-            self.visit(function.block)
+            compiled = self.compiled.get(function)
+
+            if compiled is None and self.tier_up_after is not None:
+                function.calls += 1
+
+                if function.calls >= self.tier_up_after:
+                    compiled = self.tier_up(function, function.calls)
+
+            if compiled is not None:
+                return_value = compiled(function_scope)
+
+            else:
+                self.visit(function.block)
 
         except FoundReturn as return_block:
             return_value = return_block.value
 
-        # Resetting the current_scope
-        self.current_scope = self.current_scope.enclosing_scope
+        finally:
+            # Resetting the current_scope
+            self.current_scope = caller_scope
+
+            if function_scope.rebound:
+                function_scope.leave()
+
+            if function_scope.meter is not None:
+                function_scope.meter.close(function_scope)
 
         return return_value
 
+    def resolve_call(self, node):
+        """
+        Finds the builtin or the function a call site refers to and caches it
+        Builtins are searched first and can never change
+
+        The builtins bound to the interpreter aren't cached, call sites inside of modules
+        are shared by every interpreter that imports them
+        """
+
+        bound = self.bound_builtins.get(node.name)
+
+        if bound is not None:
+            return bound
+
+        self.cache_misses += 1
+
+        builtin = ermis_globals.get(node.name)
+
+        if builtin is not None:
+            node.target = builtin
+
+            return builtin
+
+        function = self.current_scope.find(node.name)
+
+        if len(function.parameters) != len(node.parameters):
+            raise MissingFunctionParameter(function.name)
+
+        # Names inside of modules are found through the module, so they aren't cached
+        if "." in node.name:
+            node.target = None
+
+        else:
+            binding = self.current_scope.watch(node.name)
+            node.target, node.binding, node.version = function, binding, binding.version
+
+        return function
+
+    def tier_up(self, node, count):
+        """
+        Compiles a hot function or while statement and notes the event
+        """
+
+        if isinstance(node, Function):
+            compiled = self.compiled[node] = self.compiler.compile_function(node)
+            event = ("function", node.name, count)
+
+        else:
+            compiled = self.compiled[node] = self.compiler.compile_loop(node)
+            event = ("loop", "όσο", count)
+
+        self.tier_events.append(event)
+
+        if self.on_tier_up is not None:
+            self.on_tier_up(*event)
+
+        return compiled
+
+    def tiered_while_statement(self, node):
+        """
+        Replaces visit_while_statement when hot loops are compiled
+
+        Every iteration counts as a back edge, once there are enough of them
+        the rest of the loop runs in its compiled form
+        """
+
+        threshold = self.tier_up_after
+
+        if threshold is None:
+            while self.test(node.condition):
+                self.visit(node.block)
+
+            return
+
+        compiled = self.compiled.get(node)
+
+        if compiled is not None:
+            return compiled(self.current_scope)
+
+        while self.test(node.condition):
+            self.visit(node.block)
+
+            node.iterations += 1
+
+            if node.iterations >= threshold:
+                return self.tier_up(node, node.iterations)(self.current_scope)
+
+    def cache_report(self):
+        total = self.cache_hits + self.cache_misses
+        rate = self.cache_hits / total if total else 0
+
+        return f"Call site cache: {self.cache_hits} hits, {self.cache_misses} misses ({rate:.1%})"
+
 
     @when(BinaryOperation)
     def visit_binary_operation(self, node):
@@ -192,24 +556,82 @@ class ErmisVisitor(Visitor):
 
         Depending on the current_token's type,
         it will execute the correct operation between two expressions
+        from operations.binary_operations, or from its Meter's operations when it's counted
+
+        The right side of και/ή is only visited when the left side doesn't decide the result
         """
 
+        # Every operator but και/ή maps straight to its Python operation,
+        # which is faster than comparing the token type against each operator in turn
+        operation = self.operations.get(node.token.type)
         left = self.visit(node.left)
-        right = self.visit(node.right)
+
+        if operation is not None:
+            return operation(left, self.visit(node.right))
+
+        if node.token.type == TokenTypes.And:
+            return left and self.visit(node.right)
+
+        return left or self.visit(node.right)
+
+
+    def profile_binary_operation(self, node):
+        """
+        Replaces visit_binary_operation when nodes are allowed to specialize
+
+        It counts the executions that have seen the same operand types,
+        and rewrites the node into a SpecializedBinaryOperation once there are enough of them
+        """
 
         match node.token.type:
-            case TokenTypes.Plus:         return left + right
-            case TokenTypes.Minus:        return left - right
-            case TokenTypes.Multiply:     return left * right
-            case TokenTypes.Divide:       return left / right
-            case TokenTypes.GreaterThan:  return left > right
-            case TokenTypes.GreaterEqual: return left >= right
-            case TokenTypes.LessThan:     return left < right
-            case TokenTypes.LessEqual:    return left <= right
-            case TokenTypes.NotEquals:    return left != right
-            case TokenTypes.EqualsEquals: return left == right
-            case TokenTypes.And:          return left and right
-            case TokenTypes.Or:           return left or right
+            case TokenTypes.And: return self.visit(node.left) and self.visit(node.right)
+            case TokenTypes.Or:  return self.visit(node.left) or self.visit(node.right)
+
+        operation = self.operations[node.token.type]
+
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        types = (type(left), type(right))
+
+        if types == node.observed:
+            node.executions += 1
+
+            if node.executions >= self.specialize_after \
+                    and node.failures < self.max_specialization_failures \
+                    and can_specialize(node.token.type, *types):
+
+                node.__class__ = SpecializedBinaryOperation
+                node.operation = specialized_operations[node.token.type]
+                node.left_type, node.right_type = types
+
+        else:
+            node.observed = types
+            node.executions = 1
+
+        return operation(left, right)
+
+
+    @when(SpecializedBinaryOperation)
+    def visit_specialized_binary_operation(self, node):
+        """
+        Visits a specialized binary operation
+
+        If the operands don't have the expected types anymore,
+        the node goes back to being a generic binary operation
+        """
+
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        if type(left) is node.left_type and type(right) is node.right_type:
+            return node.operation(left, right)
+
+        node.__class__ = BinaryOperation
+        node.observed = None
+        node.failures += 1
+
+        return self.operations[node.token.type](left, right)
 
 
     @when(UnaryOperation)
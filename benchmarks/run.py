@@ -0,0 +1,875 @@
+"""
+Benchmarks for the Ermis interpreter
+
+Run all of them with:    python -m benchmarks.run
+or just a few of them:   python -m benchmarks.run budget_overhead
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from threading import Thread
+from time import perf_counter, sleep
+import urllib.request
+import subprocess
+import tempfile
+import shutil
+import json
+import io
+import os
+import sys
+
+from Ermis.lexer import Lexer
+from Ermis.parser import Parser
+from Ermis.visitor import ErmisVisitor
+from Ermis.budget import Budget
+from Ermis.token import TokenTypes
+from Ermis.modules import ModuleLoader
+from Ermis.checker import check_files
+from Ermis.generator import generate
+from Ermis.incremental import Document
+from Ermis.service import ExecutionService, http_server
+from Ermis.memory import Meter
+from Ermis.metrics import Metrics
+from Ermis.passes import PassManager, Resolver, TypeChecker, ConstantFolding
+from Ermis.exceptions import MemoryQuotaError
+from Ermis.AST import Function
+from Ermis import operations, parallel
+from Ermis.optimizer import Inliner, LoopInvariantMotion, CommonSubexpressions
+
+benchmarks = {}
+
+def benchmark(function):
+    """
+    A decorator to save functions
+    into the benchmarks dictionary
+    """
+
+    benchmarks[function.__name__] = function
+
+    return function
+
+def measure(callback, repeat = 3):
+    """
+    Returns the best time (in seconds) out of a few runs of callback
+    """
+
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = perf_counter()
+        callback()
+
+        best = min(best, perf_counter() - start)
+
+    return best
+
+def run_source(source, **options):
+    """
+    Parses and executes an Ermis program, hiding its output
+    """
+
+    visitor = ErmisVisitor(Parser(Lexer(source)), **options)
+
+    with redirect_stdout(io.StringIO()):
+        return visitor.execute()
+
+def run_lazy_source(source):
+    visitor = ErmisVisitor(Parser(Lexer(source), lazy=True))
+
+    with redirect_stdout(io.StringIO()):
+        return visitor.execute()
+
+def parse_source(source, **options):
+    return Parser(Lexer(source), **options).parse_compound()
+
+def helper_library(functions):
+    """
+    A large library of helper functions, each one with a non trivial body
+    """
+
+    return "".join(
+        f"""
+        συνάρτηση βοηθός_{i} (α, β) {{
+            έστω γ = α * {i} + β;
+
+            εάν (γ > 100) {{
+                γ = γ - 100;
+            }}
+
+            όσο (γ > 10) {{
+                γ = γ - 10;
+            }}
+
+            επέστρεψε γ + α * β - {i};
+        }}
+        """
+        for i in range(functions)
+    )
+
+def counting_loop(iterations):
+    return f"""
+    έστω μετρητής = 0;
+
+    όσο (μετρητής < {iterations}) {{
+        μετρητής = μετρητής + 1;
+    }}
+    """
+
+
+@benchmark
+def budget_overhead():
+    source = counting_loop(100_000)
+
+    return {
+        "no budget": measure(lambda: run_source(source)),
+        "unlimited budget": measure(lambda: run_source(source, budget=Budget())),
+        "step limit": measure(lambda: run_source(source, budget=Budget(steps=10**9)))
+    }
+
+
+@benchmark
+def lazy_parsing():
+    source = helper_library(500) + """
+    εμφάνισε (βοηθός_1 (2, 3), βοηθός_2 (4, 5), βοηθός_3 (6, 7));
+    """
+
+    return {
+        "eager parse": measure(lambda: parse_source(source)),
+        "lazy parse": measure(lambda: parse_source(source, lazy=True)),
+        "eager parse and run": measure(lambda: run_source(source)),
+        "lazy parse and run": measure(lambda: run_lazy_source(source))
+    }
+
+
+@benchmark
+def module_imports():
+    directory = tempfile.mkdtemp()
+    library = os.path.join(directory, "βιβλιοθήκη.ermis")
+
+    with open(library, "w") as f:
+        f.write(helper_library(500))
+
+    program = """
+    εισάγαγε "βιβλιοθήκη.ermis" ως β;
+    εμφάνισε (β.βοηθός_1 (2, 3), β.βοηθός_2 (4, 5));
+    """
+
+    def run_with(loader):
+        visitor = ErmisVisitor(Parser(Lexer(program)), directory=directory)
+        visitor.modules = loader
+
+        with redirect_stdout(io.StringIO()):
+            visitor.execute()
+
+    def cold_import():
+        shutil.rmtree(os.path.join(directory, ModuleLoader.cache_directory), ignore_errors=True)
+        run_with(ModuleLoader())
+
+    shared_loader = ModuleLoader()
+
+    results = {
+        "copy-pasted library": measure(lambda: run_source(helper_library(500) + program.split(";", 1)[1].replace("β.", ""))),
+        "cold import": measure(cold_import),
+        "disk cached import": measure(lambda: run_with(ModuleLoader())),
+        "memoized import": measure(lambda: run_with(shared_loader))
+    }
+
+    shutil.rmtree(directory)
+
+    return results
+
+
+@benchmark
+def expression_parsing():
+    statements = "".join(
+        f"έστω χ_{i} = α + {i} > β * 2 - γ / 3 και δ <= {i} ή ε != (α - β) * γ;\n"
+        for i in range(2000)
+    )
+
+    long_expression = "έστω ψ = " + " + ".join(["1 * 2"] * 3000) + ";"
+
+    return {
+        "2000 mixed statements": measure(lambda: parse_source(statements)),
+        "3000 term expression": measure(lambda: parse_source(long_expression))
+    }
+
+
+@benchmark
+def loop_conditions():
+    guarded = """
+    συνάρτηση ακριβή (ν) {
+        έστω κ = 0;
+
+        όσο (κ < 50) {
+            κ = κ + 1;
+        }
+
+        επέστρεψε κ;
+    }
+
+    έστω ι = 0;
+    έστω βρέθηκαν = 0;
+
+    όσο (ι < 20000) {
+        εάν (ι < 0 και ακριβή (ι) > 0) {
+            βρέθηκαν = βρέθηκαν + 1;
+        }
+
+        ι = ι + 1;
+    }
+    """
+
+    chained = """
+    έστω ι = 0;
+    έστω ν = 50000;
+
+    όσο (ι < ν και ι >= 0 και ι != ν + 1) {
+        ι = ι + 1;
+    }
+    """
+
+    return {
+        "short-circuit guard": measure(lambda: run_source(guarded)),
+        "comparison chain": measure(lambda: run_source(chained))
+    }
+
+
+@benchmark
+def inlining():
+    source = """
+    συνάρτηση τετράγωνο (χ) { επέστρεψε χ * χ; }
+    συνάρτηση άθροισμα (α, β) { επέστρεψε α + β; }
+    συνάρτηση μέσος (α, β) { επέστρεψε άθροισμα (α, β) / 2; }
+
+    έστω ι = 0;
+    έστω σύνολο = 0.0;
+
+    όσο (ι < 20000) {
+        σύνολο = σύνολο + μέσος (τετράγωνο (ι), ι);
+        ι = άθροισμα (ι, 1);
+    }
+    """
+
+    return {
+        "helper calls": measure(lambda: run_source(source)),
+        "inlined helpers": measure(lambda: run_source(source, passes=[Inliner()]))
+    }
+
+
+@benchmark
+def call_site_caches():
+    source = """
+    συνάρτηση κενή (χ) { }
+
+    έστω ι = 0;
+
+    όσο (ι < 30000) {
+        κενή (ι);
+        κενή (ι);
+        mod (ι, 2);
+        mod (ι, 3);
+
+        ι = ι + 1;
+    }
+    """
+
+    visitor = ErmisVisitor(Parser(Lexer(source)))
+
+    return {
+        "function calls": measure(lambda: run_source(source)),
+        "hits": visitor.execute() or visitor.cache_hits,
+        "misses": visitor.cache_misses
+    }
+
+
+@benchmark
+def specialization():
+    source = """
+    έστω ι = 0;
+    έστω άθροισμα = 0.0;
+    έστω μέσος = 0.0;
+
+    όσο (ι < 30000) {
+        άθροισμα = άθροισμα + ι * 2 - ι / 2 * 2;
+        μέσος = άθροισμα / (ι + 1) * 1.5;
+        ι = ι + 1;
+    }
+    """
+
+    return {
+        "generic operations": measure(lambda: run_source(source)),
+        "specializing operations": measure(lambda: run_source(source, specialize=True))
+    }
+
+
+@benchmark
+def tiered_execution():
+    source = """
+    συνάρτηση απόσταση (α, β) {
+        εάν (α > β) {
+            επέστρεψε α - β;
+        }
+
+        επέστρεψε β - α;
+    }
+
+    έστω ι = 0;
+    έστω σύνολο = 0;
+
+    όσο (ι < 30000) {
+        σύνολο = σύνολο + απόσταση (ι, 15000) * 2;
+        ι = ι + 1;
+    }
+    """
+
+    visitor = ErmisVisitor(Parser(Lexer(source)), tier_up_after=100)
+    visitor.execute()
+
+    return {
+        "visitor only": measure(lambda: run_source(source)),
+        "tier up after 100": measure(lambda: run_source(source, tier_up_after=100)),
+        "tier up events": len(visitor.tier_events)
+    }
+
+
+@benchmark
+def invariant_code_motion():
+    source = """
+    έστω πλευρά = 12.5;
+    έστω ύψος = 3.0;
+    έστω ι = 0;
+    έστω σύνολο = 0.0;
+
+    όσο (ι < 20000) {
+        σύνολο = σύνολο + ρίζα (πλευρά * πλευρά + ύψος * ύψος) * ι;
+        σύνολο = σύνολο - (ι * 2 + 1) * (ι * 2 + 1) / (ι * 2 + 1);
+        ι = ι + 1;
+    }
+    """
+
+    motion = LoopInvariantMotion()
+    sharing = CommonSubexpressions()
+    sharing.run(motion.run(parse_source(source)))
+
+    return {
+        "unoptimized": measure(lambda: run_source(source)),
+        "hoisted and shared": measure(
+            lambda: run_source(source, passes=[LoopInvariantMotion(), CommonSubexpressions()])
+        ),
+        "hoisted expressions": motion.hoisted,
+        "shared expressions": sharing.shared
+    }
+
+
+@benchmark
+def arithmetic_operators():
+    sieve = """
+    έστω ν = 2;
+    έστω δ = 2;
+    έστω πρώτος = Αληθές;
+    έστω πρώτοι = 0;
+
+    όσο (ν < 1500) {
+        δ = 2;
+        πρώτος = Αληθές;
+
+        όσο (πρώτος και δ * δ <= ν) {
+            εάν (ν % δ == 0) { πρώτος = Ψευδές; }
+            δ = δ + 1;
+        }
+
+        εάν (πρώτος) { πρώτοι = πρώτοι + 1; }
+        ν = ν + 1;
+    }
+    """
+
+    gcd = """
+    συνάρτηση μκδ (α, β) {
+        έστω υ = 0;
+
+        όσο (β != 0) {
+            υ = α % β;
+            α = β;
+            β = υ;
+        }
+
+        επέστρεψε α;
+    }
+
+    έστω ι = 1;
+    έστω σύνολο = 0;
+
+    όσο (ι < 3000) {
+        σύνολο = σύνολο + μκδ (ι * 7919, 104729 // ι + ι ^ 2);
+        ι = ι + 1;
+    }
+    """
+
+    def with_builtins(source):
+        return (
+            source.replace("ν % δ", "mod (ν, δ)")
+                  .replace("α % β", "mod (α, β)")
+                  .replace("104729 // ι", "div (104729, ι)")
+                  .replace("ι ^ 2", "ι * ι")
+        )
+
+    return {
+        "sieve with mod": measure(lambda: run_source(with_builtins(sieve))),
+        "sieve with %": measure(lambda: run_source(sieve)),
+        "gcd with mod and div": measure(lambda: run_source(with_builtins(gcd))),
+        "gcd with % and //": measure(lambda: run_source(gcd)),
+        "sieve with %, tiered": measure(lambda: run_source(sieve, tier_up_after=100)),
+        "gcd with % and //, tiered": measure(lambda: run_source(gcd, tier_up_after=100))
+    }
+
+
+@benchmark
+def string_building():
+    def building(size):
+        return f"""
+        έστω κομμάτι = "{"α" * 100}";
+        έστω κείμενο = "";
+        έστω ι = 0;
+
+        όσο (ι < {size // 100}) {{
+            κείμενο = κείμενο + κομμάτι;
+            ι = ι + 1;
+        }}
+
+        εμφάνισε (κείμενο == κείμενο + "");
+        """
+
+    def without_ropes(source):
+        rope_after = operations.rope_after
+        operations.rope_after = float("inf")
+
+        try:
+            run_source(source)
+
+        finally:
+            operations.rope_after = rope_after
+
+    megabyte = building(1_000_000)
+
+    return {
+        "1M characters, plain strings": measure(lambda: without_ropes(megabyte), repeat=1),
+        "1M characters, ropes": measure(lambda: run_source(megabyte)),
+        "10M characters, ropes": measure(lambda: run_source(building(10_000_000)), repeat=1)
+    }
+
+
+# Lexes a file in a fresh process and prints the peak memory of that process, in KB
+# On Linux ru_maxrss survives exec, so it would include the memory of the benchmarks' process
+lex_file = """
+import resource, sys
+from Ermis.lexer import Lexer
+from Ermis.token import TokenTypes
+
+if sys.argv[2] == "streamed":
+    lexer = Lexer.from_file(sys.argv[1])
+
+else:
+    with open(sys.argv[1], encoding="utf-8") as f:
+        lexer = Lexer(f.read())
+
+while lexer.get_next_token().type != TokenTypes.EOF:
+    pass
+
+try:
+    with open("/proc/self/status") as f:
+        print(next(line.split()[1] for line in f if line.startswith("VmHWM")))
+
+except OSError:
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+@benchmark
+def streamed_lexing():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "μεγάλο.ermis")
+
+    # About 16MB of UTF-8, mostly Greek
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(150_000):
+            f.write(f'έστω μεταβλητή_{i} = {i} * 3.25 + "κείμενο"; >> σχόλιο\n')
+
+    def peak_memory(mode):
+        output = subprocess.run(
+            [sys.executable, "-c", lex_file, path, mode],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+
+        return f"{int(output) // 1024} MB"
+
+    def lex(lexer):
+        while lexer.get_next_token().type != TokenTypes.EOF:
+            pass
+
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    results = {
+        "file size": f"{os.path.getsize(path) // 2**20} MB",
+        "whole source": measure(lambda: lex(Lexer(source)), repeat=1),
+        "streamed": measure(lambda: lex(Lexer.from_file(path)), repeat=1),
+        "whole source peak RSS": peak_memory("whole"),
+        "streamed peak RSS": peak_memory("streamed")
+    }
+
+    shutil.rmtree(directory)
+
+    return results
+
+
+@benchmark
+def syntax_check():
+    directory = tempfile.mkdtemp()
+
+    for i in range(400):
+        with open(os.path.join(directory, f"πρόγραμμα_{i}.ermis"), "w", encoding="utf-8") as f:
+            f.write(generate(i, functions=10))
+
+    results = {
+        "files": 400,
+        "serial": measure(lambda: check_files([directory], jobs=1), repeat=1),
+        "process pool": measure(lambda: check_files([directory]), repeat=1),
+        "CPUs": os.cpu_count()
+    }
+
+    shutil.rmtree(directory)
+
+    return results
+
+
+@benchmark
+def map_lookups():
+    # The same table of 64 keys, once as an if chain and once as a map
+    keys = 64
+
+    chain = "\n        αλλιώς ".join(
+        f"εάν (κ == {i}) {{ τιμή = {i * 3}; }}" for i in range(keys)
+    )
+
+    entries = ", ".join(f"{i}: {i * 3}" for i in range(keys))
+
+    def lookups(lookup):
+        return f"""
+        έστω πίνακας = {{{entries}}};
+        έστω κ = 0;
+        έστω τιμή = 0;
+        έστω σύνολο = 0;
+        έστω ι = 0;
+
+        όσο (ι < 20000) {{
+            κ = ι % {keys};
+            {lookup}
+            σύνολο = σύνολο + τιμή;
+            ι = ι + 1;
+        }}
+        """
+
+    return {
+        "keys": keys,
+        "if chain": measure(lambda: run_source(lookups(chain))),
+        "map": measure(lambda: run_source(lookups("τιμή = πίνακας[κ];"))),
+        "map, tiered": measure(lambda: run_source(lookups("τιμή = πίνακας[κ];"), tier_up_after=2))
+    }
+
+
+@benchmark
+def parallel_calls():
+    source = """
+    συνάρτηση διαιρέτες (ν) {
+        έστω δ = 1;
+        έστω πλήθος = 0;
+
+        όσο (δ <= ν) {
+            εάν (ν % δ == 0) { πλήθος = πλήθος + 1; }
+            δ = δ + 1;
+        }
+
+        επέστρεψε πλήθος;
+    }
+
+    έστω πλήθη = παράλληλα (διαιρέτες, εύρος (2000, 2200));
+    """
+
+    def with_jobs(jobs):
+        parallel.jobs = jobs
+
+        try:
+            return measure(lambda: run_source(source), repeat=1)
+
+        finally:
+            parallel.jobs = None
+
+    return {
+        "in process": with_jobs(1),
+        "2 processes": with_jobs(2),
+        "4 processes": with_jobs(4),
+        "CPUs": os.cpu_count()
+    }
+
+
+@benchmark
+def incremental_parsing():
+    source = generate(0, statements=10500, functions=180)
+    document = Document(source)
+
+    middle = document.starts[len(document.starts) // 2]
+    functions = [index for index, segment in enumerate(document.segments) if isinstance(segment.node, Function)]
+    function = functions[len(functions) // 2]
+
+    def typing(position, text):
+        # Types text one character at a time and then deletes it again
+        def edits():
+            for offset, character in enumerate(text):
+                document.edit(position + offset, position + offset, character)
+
+            document.edit(position, position + len(text), "")
+
+        return measure(edits) / (len(text) + 1)
+
+    return {
+        "lines": source.count("\n"),
+        "full parse": measure(lambda: parse_source(source), repeat=1),
+        "full lex and parse, kept": measure(lambda: Document(source), repeat=1),
+        "edit a top level statement": typing(middle, "έστω νέο = 1;"),
+        "edit inside of a function": typing(document.starts[function + 1] - 2, "εμφάνισε (1);"),
+        "edit at the start": typing(0, "έστω νέο = 1;"),
+        "open a string": measure(lambda: (document.edit(middle, middle, '"'), document.edit(middle, middle + 1, "")), repeat=1)
+    }
+
+
+@benchmark
+def generated_programs():
+    # A large random program, the same one on every engine
+    source = generate(0, statements=1000, depth=4, functions=20)
+
+    return {
+        "lines": source.count("\n"),
+        "parse": measure(lambda: parse_source(source)),
+        "visitor": measure(lambda: run_source(source)),
+        "lazy": measure(lambda: run_lazy_source(source)),
+        "optimized": measure(lambda: run_source(source, passes=[Inliner(), LoopInvariantMotion(), CommonSubexpressions()])),
+        "specialized": measure(lambda: run_source(source, specialize=True)),
+        "tiered": measure(lambda: run_source(source, tier_up_after=2))
+    }
+
+
+run_file = """
+import sys
+from Ermis import Ermis
+
+Ermis.from_filename(sys.argv[1]).execute()
+"""
+
+@benchmark
+def fork_server_launch():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    directory = tempfile.mkdtemp()
+
+    path = os.path.join(directory, "γεια.ermis")
+    socket_path = os.path.join(directory, "ermis.sock")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('εμφάνισε ("Γειά σου κόσμε");')
+
+    server = subprocess.Popen([sys.executable, "-m", "Ermis.forkserver", "--socket", socket_path], cwd=root)
+
+    while not os.path.exists(socket_path):
+        sleep(0.01)
+
+    def launches(command, count = 10):
+        def launch():
+            for _ in range(count):
+                subprocess.run(command, cwd=root, check=True, stdout=subprocess.DEVNULL)
+
+        return measure(launch) / count
+
+    try:
+        results = {
+            "python interpreter": launches([sys.executable, "-c", run_file, path]),
+            "fork server client": launches([sys.executable, "client.py", "--socket", socket_path, path]),
+            "bare python": launches([sys.executable, "-c", "pass"])
+        }
+
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory)
+
+    return results
+
+
+@benchmark
+def pass_manager():
+    source = generate(0, statements=1000, depth=4, functions=20)
+    tree = parse_source(source)
+
+    manager = PassManager([
+        Resolver(),
+        TypeChecker(),
+        ConstantFolding(),
+        Inliner(),
+        LoopInvariantMotion(),
+        CommonSubexpressions()
+    ], trace_memory=True)
+
+    manager.run(tree)
+
+    # The dispatch table is built with the class, so a visitor costs next to nothing to create
+    results = {
+        "1000 visitors": measure(lambda: [ErmisVisitor(None) for _ in range(1000)]),
+        "visitor only": measure(lambda: run_source(source))
+    }
+
+    # Traced, so the times are only comparable with each other
+    for report in manager.reports:
+        results[f"{report.name}"] = report.seconds
+        results[f"{report.name} peak KB"] = f"{report.peak / 1024:.1f}"
+        results[f"{report.name} retained KB"] = f"{report.retained / 1024:+.1f}"
+
+    return results
+
+
+@benchmark
+def memory_accounting():
+    # Assignments, calls and key assignments, which are what a meter counts
+    source = """
+    συνάρτηση βήμα (ν) {
+        επέστρεψε ν + 1;
+    }
+
+    έστω χάρτης = {};
+    έστω κείμενο = "";
+    έστω ι = 0;
+
+    όσο (ι < 30000) {
+        χάρτης[ι % 100] = ι;
+        κείμενο = κείμενο + "α";
+        ι = βήμα (ι);
+    }
+    """
+
+    runaway = 'έστω σ = "α"; όσο (Αληθές) { σ = σ + σ; }'
+    meter = Meter()
+
+    def stopped(quota):
+        try:
+            run_source(runaway, meter=Meter(quota))
+
+        except MemoryQuotaError:
+            return "stopped"
+
+    generated = generate(0, statements=1000, depth=4, functions=20)
+
+    return {
+        "no meter": measure(lambda: run_source(source)),
+        "meter": measure(lambda: run_source(source, meter=meter)),
+        "no meter, tiered": measure(lambda: run_source(source, tier_up_after=100)),
+        "meter, tiered": measure(lambda: run_source(source, tier_up_after=100, meter=Meter())),
+        "generated, no meter": measure(lambda: run_source(generated)),
+        "generated, meter": measure(lambda: run_source(generated, meter=Meter())),
+        "peak bytes": meter.peak,
+        "doubling string, 100MB quota": stopped(10**8)
+    }
+
+
+@benchmark
+def service_load():
+    # Many small programs from concurrent clients, each one a different user's
+    programs = [generate(i, statements=20, functions=2) for i in range(200)]
+
+    service = ExecutionService(interpreters=4, queue_size=len(programs), steps=10**6)
+    server = http_server(service, port=0)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/run"
+
+    def post(source):
+        request = urllib.request.Request(url, json.dumps({"source": source}).encode("utf-8"))
+
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    started = perf_counter()
+
+    with ThreadPoolExecutor(16) as clients:
+        results = list(clients.map(post, programs))
+
+    elapsed = perf_counter() - started
+    statistics = service.statistics()
+
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+    # Each output has to be the one the program prints on a fresh interpreter of its own
+    def alone(source):
+        output = io.StringIO()
+
+        with redirect_stdout(output):
+            ErmisVisitor(Parser(Lexer(source))).execute()
+
+        return output.getvalue()
+
+    return {
+        "programs": len(results),
+        "errors": sum(result["error"] is not None for result in results),
+        "outputs as if alone": sum(result["output"] == alone(source) for result, source in zip(results, programs)),
+        "wall time over HTTP": elapsed,
+        "programs per second": f"{statistics['throughput']:.0f}",
+        "p50 latency": statistics["p50"],
+        "p90 latency": statistics["p90"],
+        "p99 latency": statistics["p99"]
+    }
+
+
+@benchmark
+def interpreter_metrics():
+    source = """
+    συνάρτηση βήμα (ν) {
+        επέστρεψε ν + 1;
+    }
+
+    έστω ι = 0;
+
+    όσο (ι < 30000) {
+        ι = βήμα (ι);
+    }
+    """
+
+    metrics = Metrics()
+    run_source(source, metrics=metrics)
+
+    generated = generate(0, statements=1000, depth=4, functions=20)
+
+    # Without metrics the visitor runs the same code as before they existed
+    return {
+        "no metrics": measure(lambda: run_source(source)),
+        "metrics": measure(lambda: run_source(source, metrics=Metrics())),
+        "generated, no metrics": measure(lambda: run_source(generated)),
+        "generated, metrics": measure(lambda: run_source(generated, metrics=Metrics())),
+        "nodes": sum(metrics.nodes.values()),
+        "lookups": metrics.lookups,
+        "calls": metrics.calls,
+        "returns": metrics.returns
+    }
+
+
+def main(names):
+    for name in names or benchmarks:
+        print(name)
+
+        for label, value in benchmarks[name]().items():
+            # Floats are timings in seconds, everything else is printed as is
+            if isinstance(value, float):
+                print(f"  {label:<30} {value * 1000:10.2f} ms")
+
+            else:
+                print(f"  {label:<30} {value:>10}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,102 @@
+"""
+Runs an Ermis program on a running fork server: python -m Ermis.forkserver
+
+Its startup is what the fork server saves, so it only imports a few small modules:
+the arguments are read by hand instead of with argparse, and the socket comes from
+the C module _socket, without the enum heavy wrapper of the socket module
+Usage: python client.py [--socket PATH] [--steps N] [--seconds S] program.ermis
+"""
+
+import _socket
+import struct
+import json
+import sys
+import os
+
+usage = "usage: python client.py [--socket PATH] [--steps N] [--seconds S] program.ermis"
+
+header = struct.Struct("!cI")
+
+def send_frame(connection, kind, payload):
+    connection.sendall(header.pack(kind, len(payload)) + payload)
+
+def receive_exactly(connection, size):
+    data = b""
+
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+
+        if not chunk:
+            return None
+
+        data += chunk
+
+    return data
+
+def parse_arguments(arguments):
+    options = {"--socket": "/tmp/ermis.sock", "--steps": None, "--seconds": None}
+    program = None
+
+    arguments = iter(arguments)
+
+    for argument in arguments:
+        if argument in options:
+            options[argument] = next(arguments, None)
+
+            if options[argument] is None:
+                sys.exit(usage)
+
+        elif program is None and not argument.startswith("-"):
+            program = argument
+
+        else:
+            sys.exit(usage)
+
+    if program is None:
+        sys.exit(usage)
+
+    try:
+        steps = options["--steps"] and int(options["--steps"])
+        seconds = options["--seconds"] and float(options["--seconds"])
+
+    except ValueError:
+        sys.exit(usage)
+
+    return program, options["--socket"], steps, seconds
+
+def main():
+    program, path, steps, seconds = parse_arguments(sys.argv[1:])
+
+    with open(program, encoding="utf-8") as f:
+        request = {
+            "source": f.read(),
+            "directory": os.path.dirname(os.path.abspath(program)),
+            "steps": steps,
+            "seconds": seconds
+        }
+
+    connection = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    connection.connect(path)
+
+    send_frame(connection, b"r", json.dumps(request).encode("utf-8"))
+
+    outputs = {b"o": sys.stdout.buffer, b"e": sys.stderr.buffer}
+
+    while True:
+        head = receive_exactly(connection, header.size)
+
+        # The server went away without an exit code
+        if head is None:
+            return 1
+
+        kind, length = header.unpack(head)
+        payload = receive_exactly(connection, length)
+
+        if kind == b"x":
+            return payload[0]
+
+        outputs[kind].write(payload)
+        outputs[kind].flush()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,25 @@
 from Ermis import Ermis
+from Ermis.metrics import Metrics
+from Ermis.exceptions import ErmisError
+import sys
 
 def main():
+    # python main.py --metrics FILE writes the interpreter's counters to FILE on exit,
+    # as JSON when it ends with .json and in the Prometheus text format otherwise
+    metrics = None
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--metrics":
+        metrics = Metrics()
+        metrics.dump_on_exit(sys.argv[2])
+
     filename = input("Insert filename: ")
 
-    interpreter = Ermis.from_filename(filename)
-    interpreter.execute()
+    try:
+        interpreter = Ermis.from_filename(filename, metrics=metrics)
+        interpreter.execute()
+
+    except ErmisError as error:
+        error.report()
 
 if __name__ == "__main__":
     main()